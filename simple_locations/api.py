@@ -1,6 +1,7 @@
 from ninja import NinjaAPI
 
+from simple_locations.renderers import ORJSONRenderer
 from simple_locations.router import router
 
-api = NinjaAPI(csrf=True)
+api = NinjaAPI(csrf=True, renderer=ORJSONRenderer())
 api.add_router("/simple_locations/", router)
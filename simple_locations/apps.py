@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SimpleLocationsConfig(AppConfig):
+    default_auto_field = "django.db.models.AutoField"
+    name = "simple_locations"
+
+    def ready(self):
+        from simple_locations import signals  # noqa: F401
@@ -0,0 +1,105 @@
+"""
+Precompressed GeoJSON bodies for the router's by-type and by-parent endpoints
+
+Each endpoint is built for every area type / parent, `SIMPLIFICATION_LEVELS`
+index and quantize value, and stored in the response cache as is and gzip
+(and brotli, with the `brotli` extra installed) compressed. The router serves these to clients
+which accept the encoding, so nothing is compressed on the fly.
+Entries are evicted with the rest of the response cache when areas change.
+"""
+import gzip
+from itertools import product
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+)
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from simple_locations import cache
+from simple_locations.feature_manager import FeatureQueryset
+from simple_locations.gis_functions import SIMPLIFICATION_LEVELS
+from simple_locations.models import Area, AreaType
+
+# Brotli is "nice to have"
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {"gzip": lambda body: gzip.compress(body, compresslevel=9)}
+if brotli is not None:
+    ENCODERS["br"] = lambda body: brotli.compress(body, quality=11)
+
+DEFAULT_QUANTIZE: Sequence[int] = (3, 4, 5, 6)
+
+
+class Artifact(NamedTuple):
+    name: str  # The name of the router operation
+    scope: str
+    key: Any
+    arguments: Dict[str, Any]
+    queryset: FeatureQueryset
+    simplify: Optional[float] = None
+    quantize: Optional[int] = None
+
+
+def _collections(
+    name: str, scope: str, argument: str, key: Any, queryset: FeatureQueryset, quantize_values: Iterable[int]
+) -> Iterator[Artifact]:
+    yield Artifact(name, scope, key, {argument: key}, queryset)
+    for simplify, quantize in product(range(len(SIMPLIFICATION_LEVELS)), quantize_values):
+        yield Artifact(
+            f"{name}_compressed",
+            scope,
+            key,
+            {argument: key, "simplify": simplify, "quantize": quantize},
+            queryset,
+            simplify=SIMPLIFICATION_LEVELS[simplify],
+            quantize=quantize,
+        )
+
+
+def artifacts(quantize_values: Iterable[int] = DEFAULT_QUANTIZE) -> Iterator[Artifact]:
+    """
+    Every by-type and by-parent response to build
+    """
+    quantize_values = list(quantize_values)
+    for slug in AreaType.objects.values_list("slug", flat=True):
+        queryset = Area.features.filter(kind__slug=slug)
+        yield from _collections("area_type", "type", "area_type", slug, queryset, quantize_values)
+    for parent_id in Area.objects.exclude(parent=None).order_by().values_list("parent_id", flat=True).distinct():
+        queryset = Area.features.filter(parent=parent_id)
+        yield from _collections("area_children", "parent", "area_id", parent_id, queryset, quantize_values)
+
+
+def build(quantize_values: Iterable[int] = DEFAULT_QUANTIZE, encodings: Optional[Iterable[str]] = None) -> int:
+    """
+    Render, compress and store every artifact. Returns the number of responses built.
+    """
+    response_cache = cache.get_cache()
+    if response_cache is None:
+        raise ImproperlyConfigured("SIMPLE_LOCATIONS_CACHE must be set to store precompressed responses")
+    encodings = list(ENCODERS) if encodings is None else list(encodings)
+    timeout = getattr(settings, "SIMPLE_LOCATIONS_CACHE_TIMEOUT", None)
+    count = 0
+    for artifact in artifacts(quantize_values):
+        body = artifact.queryset.to_featurecollection_json(simplify=artifact.simplify, quantize=artifact.quantize)
+        entries = {
+            cache.entry_key(response_cache, artifact.name, artifact.scope, artifact.key, **artifact.arguments): body
+        }
+        for encoding in encodings:
+            key = cache.entry_key(
+                response_cache, artifact.name, artifact.scope, artifact.key, encoding, **artifact.arguments
+            )
+            entries[key] = ENCODERS[encoding](body)
+        response_cache.set_many(entries, timeout)
+        count += 1
+    return count
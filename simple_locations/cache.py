@@ -0,0 +1,158 @@
+"""
+Response caching for the GeoJSON router
+
+Enable by naming a Django cache in settings:
+
+>>> SIMPLE_LOCATIONS_CACHE = "default"
+>>> SIMPLE_LOCATIONS_CACHE_TIMEOUT = None  # Entries are evicted by signals so may be kept forever
+
+Entries are grouped into "scopes": a single area ("id"), the children of an
+area ("parent"), the areas of a type ("type") and the whole hierarchy
+("tree", which has the single key `ALL`). Each scope has a generation
+token which is part of the key of every entry in it, so replacing the token
+evicts every simplify / quantize variant of that scope at once.
+`simple_locations.signals` replaces the tokens affected when an Area, AreaType or Border changes.
+
+Bodies may also be stored gzip or brotli compressed ahead of time
+(see `simple_locations.artifacts`) and are served to clients which accept that encoding.
+"""
+import hashlib
+from functools import wraps
+from typing import Any, Callable, List, Optional
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.http import HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
+from django.utils.cache import patch_vary_headers
+from pydantic import BaseModel
+
+PREFIX = "simple_locations"
+
+# Operation arguments which do not change the body of a response
+IGNORED_ARGUMENTS = ("response", "render")
+
+# Encodings which may be precompressed, in order of preference
+ENCODINGS = ("br", "gzip")
+
+# The key of scopes which are not split by an operation argument
+ALL = "all"
+
+
+def get_cache() -> Optional[BaseCache]:
+    """
+    The cache configured in `SIMPLE_LOCATIONS_CACHE`, if any
+    """
+    alias = getattr(settings, "SIMPLE_LOCATIONS_CACHE", None)
+    return caches[alias] if alias else None
+
+
+def _generation_key(scope: str, key: Any) -> str:
+    return f"{PREFIX}:generation:{scope}:{key}"
+
+
+def generation(cache: BaseCache, scope: str, key: Any) -> str:
+    """
+    The current generation token of a scope
+    """
+    generation_key = _generation_key(scope, key)
+    token = cache.get(generation_key)
+    if token is None:
+        cache.add(generation_key, uuid4().hex, None)
+        token = cache.get(generation_key)
+    return token
+
+
+def invalidate(scope: str, *keys: Any) -> None:
+    """
+    Evict every cached entry of the given scope keys
+    """
+    cache = get_cache()
+    if cache is None:
+        return
+    cache.set_many({_generation_key(scope, key): uuid4().hex for key in keys if key is not None}, None)
+
+
+def entry_key(cache: BaseCache, name: str, scope: str, key: Any, encoding: str = "", **arguments) -> str:
+    """
+    The key of a cached response body for an operation called with `arguments`,
+    optionally precompressed with `encoding`. Optional arguments which are
+    not set (None or False) are not part of the key.
+    """
+    variant = ":".join(
+        f"{k}={v}"
+        for k, v in sorted(arguments.items())
+        if k not in IGNORED_ARGUMENTS and v is not None and v is not False
+    )
+    digest = hashlib.md5(variant.encode()).hexdigest()
+    return f"{PREFIX}:{name}:{scope}:{key}:{generation(cache, scope, key)}:{digest}:{encoding}"
+
+
+def accepted_encodings(request: HttpRequest) -> List[str]:
+    """
+    The precompressed encodings acceptable to the client, in order of preference
+    """
+    accepted = set()
+    for coding in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, parameter = coding.partition(";")
+        weight = parameter.strip()[2:] if parameter.strip().startswith("q=") else "1"
+        try:
+            if float(weight) > 0:
+                accepted.add(name.strip().lower())
+        except ValueError:
+            continue
+    return [encoding for encoding in ENCODINGS if encoding in accepted]
+
+
+def render(result: Any) -> Optional[bytes]:
+    """
+    The body of an operation's result, if it can be cached
+    """
+    if isinstance(result, BaseModel):
+        return result.json().encode()
+    if isinstance(result, HttpResponse) and result.status_code == 200:
+        return result.content
+    return None
+
+
+def cached(scope: str, key: Optional[str] = None):
+    """
+    Decorate a ninja operation to cache its body in the scope identified
+    by the operation's `key` argument, or in the `ALL` key of the scope
+    if there is no `key`. Streamed responses are not cached.
+    """
+
+    def decorator(func: Callable):
+        @wraps(func)
+        def inner(request: HttpRequest, *args, **kwargs) -> Any:
+            cache = get_cache()
+            if cache is None or kwargs.get("render") == "stream":
+                return func(request, *args, **kwargs)
+            scope_key = kwargs[key] if key is not None else ALL
+            for encoding in accepted_encodings(request):
+                compressed = cache.get(entry_key(cache, func.__name__, scope, scope_key, encoding, **kwargs))
+                if compressed is not None:
+                    response = HttpResponse(compressed, content_type="application/json")
+                    response.headers["Content-Encoding"] = encoding
+                    patch_vary_headers(response, ("Accept-Encoding",))
+                    return response
+            cache_key = entry_key(cache, func.__name__, scope, scope_key, **kwargs)
+            body = cache.get(cache_key)
+            if body is None:
+                result = func(request, *args, **kwargs)
+                body = render(result)
+                if body is None:
+                    response = result if isinstance(result, HttpResponseBase) else kwargs.get("response")
+                    if isinstance(response, HttpResponseBase):
+                        patch_vary_headers(response, ("Accept-Encoding",))
+                    return result
+                cache.set(cache_key, body, getattr(settings, "SIMPLE_LOCATIONS_CACHE_TIMEOUT", None))
+            response = HttpResponse(body, content_type="application/json")
+            # Shared caches must not serve this to a client which accepts a precompressed body, or vice versa
+            patch_vary_headers(response, ("Accept-Encoding",))
+            return response
+
+        return inner
+
+    return decorator
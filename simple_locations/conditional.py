@@ -0,0 +1,117 @@
+"""
+Conditional GET support for GeoJSON responses
+
+Each Area (and ProjectedArea and Border, for vector tiles) carries a
+`last_modified` timestamp maintained on save.
+The "version" of a response is derived from the latest timestamp and
+the number of areas in its queryset, which is a cheap aggregate compared
+to generating the body. This provides ETag and Last-Modified headers,
+and a 304 response when the client's copy is current.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+from typing import Callable, NamedTuple, Optional, Type
+
+from django.db.models import Count, Max, Model, QuerySet
+from django.http import HttpRequest, HttpResponse
+from django.http.response import HttpResponseBase
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class Version(NamedTuple):
+    last_modified: Optional[datetime]
+    count: int
+
+    def etag(self, request: HttpRequest) -> str:
+        """
+        An ETag for the version of a given request's URL
+        """
+        last_modified = self.last_modified.isoformat() if self.last_modified else ""
+        key = f"{request.get_full_path()}:{last_modified}:{self.count}"
+        return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+    @property
+    def timestamp(self) -> Optional[int]:
+        return int(self.last_modified.timestamp()) if self.last_modified else None
+
+
+def queryset_version(queryset: QuerySet) -> Version:
+    """
+    The version of an Area queryset
+    """
+    return Version(**queryset.order_by().aggregate(last_modified=Max("last_modified"), count=Count("pk")))
+
+
+def combined_version(*versions: Version) -> Version:
+    """
+    The version of a response built from several querysets
+    """
+    timestamps = [version.last_modified for version in versions if version.last_modified]
+    return Version(max(timestamps, default=None), sum(version.count for version in versions))
+
+
+def conditional_response(request: HttpRequest, version: Version) -> Optional[HttpResponseBase]:
+    """
+    Return a "304 Not Modified" response if the client's copy is current
+    """
+    return get_conditional_response(request, etag=version.etag(request), last_modified=version.timestamp)
+
+
+def set_validators(request: HttpRequest, response: HttpResponseBase, version: Version) -> None:
+    """
+    Add ETag and Last-Modified headers to a response
+    """
+    etag = version.etag(request)
+    # Compressed representations share the version of the body, so are weak
+    response.headers["ETag"] = f"W/{etag}" if response.has_header("Content-Encoding") else etag
+    if version.timestamp is not None:
+        response.headers["Last-Modified"] = http_date(version.timestamp)
+
+
+def conditional(get_queryset: Callable[..., QuerySet], *related: Type[Model]):
+    """
+    Decorate a ninja operation to answer conditional GETs.
+    `get_queryset` is called with the operation's keyword arguments
+    and returns the Areas in the response. The response is also versioned
+    by every row of the `related` models (with a `last_modified` field)
+    for operations which draw on them.
+
+    The operation should declare a `response: HttpResponse` argument
+    so that headers can be set when it returns a schema instance.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def inner(request: HttpRequest, *args, **kwargs):
+            version = queryset_version(get_queryset(**kwargs))
+            if related:
+                version = combined_version(version, *(queryset_version(model.objects.all()) for model in related))
+            not_modified = conditional_response(request, version)
+            if not_modified:
+                return not_modified
+            result = func(request, *args, **kwargs)
+            response = result if isinstance(result, HttpResponseBase) else kwargs.get("response")
+            if isinstance(response, HttpResponseBase):
+                set_validators(request, response, version)
+            return result
+
+        return inner
+
+    return decorator
+
+
+class ConditionalLayerMixin:
+    """
+    Answer conditional GETs for a `GeoJSONLayerView` from the version of its queryset
+    """
+
+    def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        version = queryset_version(self.get_queryset())  # type: ignore
+        not_modified = conditional_response(request, version)
+        if not_modified:
+            return not_modified
+        response = super().dispatch(request, *args, **kwargs)  # type: ignore
+        set_validators(request, response, version)
+        return response
@@ -1,9 +1,23 @@
-from typing import Generator, Union
+import json
+from typing import Any, Dict, Generator, Iterable, Iterator, Union
 
-from django.db import models
+from django.contrib.gis.db.models.functions import AsGeoJSON, Transform
+from django.contrib.gis.geos import Polygon
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models
+from django.db.models.functions import Cast, Coalesce
+from django.http import HttpResponse, StreamingHttpResponse
 from geojson_pydantic import FeatureCollection, Feature
 
-from simple_locations.gis_functions import JsonFeature
+from simple_locations.gis_functions import (
+    SIMPLIFICATION_LEVELS,
+    BBox,
+    JsonFeature,
+    Multi,
+    Simplify,
+    SimplifyPreserve,
+)
+from simple_locations.topojson import build_topology
 
 
 class FeatureQueryset(models.QuerySet):
@@ -33,12 +47,48 @@ class FeatureQueryset(models.QuerySet):
         """  # noqa: E501
         return FeatureCollection.construct(features=[*self.to_features(simplify=simplify, quantize=quantize)])
 
+    def for_ids(self, ids: Iterable[int]) -> "FeatureQueryset":
+        """
+        Filter to a batch of areas, so they can be returned as one
+        FeatureCollection from one query:
+
+        >>> Area.features.for_ids([1, 2, 3]).to_featurecollection_json(simplify=1e-3, quantize=5)
+        """
+        return self.filter(pk__in=list(ids))
+
+    def in_bbox(self, bbox: BBox) -> "FeatureQueryset":
+        """
+        Filter to areas whose bounding box intersects (xmin, ymin, xmax, ymax).
+        This is the `&&` operator, which is answered from the GiST index on `geom`
+        """
+        envelope = Polygon.from_bbox(bbox)
+        envelope.srid = 4326
+        return self.filter(geom__bboverlaps=envelope)
+
+    def stored_geometry(self, simplify: float) -> Coalesce:
+        """
+        The precomputed `SimplifiedArea` geometry for a simplification level,
+        falling back to simplifying on the fly if it has not been stored
+        """
+        stored = self.model._meta.get_field("simplified").related_model.objects.filter(
+            area=models.OuterRef("pk"), simplify=simplify
+        )
+        return Coalesce(
+            models.Subquery(stored.values("geom")[:1]), Multi(SimplifyPreserve(models.F("geom"), simplify=simplify))
+        )
+
     def annotate_features(self, simplify: Union[float, None] = None, quantize: Union[int, None] = None):
         """
         Annotated 'feature' fields onto the queryset
         """
+        if simplify and simplify in SIMPLIFICATION_LEVELS:
+            geom_field: Union[str, Coalesce] = self.stored_geometry(simplify)
+            simplify = None
+        else:
+            geom_field = "geom"
         return self.annotate(
             JsonFeature(
+                geom_field=geom_field,
                 simplify=simplify,
                 quantize=quantize,
                 # The following fields become "properties"
@@ -58,6 +108,94 @@ class FeatureQueryset(models.QuerySet):
         """
         return (Feature(**area.feature) for area in self.annotate_features(simplify=simplify, quantize=quantize))
 
+    def iter_featurecollection(
+        self, simplify: Union[float, None] = None, quantize: Union[int, None] = None, chunk_size: int = 500
+    ) -> Iterator[str]:
+        """
+        Yield a GeoJSON FeatureCollection piece by piece
+
+        Features are read through a server-side cursor as JSON text
+        and written out unchanged, so memory use does not grow with
+        the size of the collection
+        """
+        features = (
+            self.annotate_features(simplify=simplify, quantize=quantize)
+            .annotate(feature_text=Cast("feature", output_field=models.TextField()))
+            .values_list("feature_text", flat=True)
+        )
+        yield '{"type": "FeatureCollection", "features": ['
+        separator = ""
+        for feature in features.iterator(chunk_size=chunk_size):
+            yield separator + feature
+            separator = ","
+        yield "]}"
+
+    def to_featurecollection_json(
+        self, simplify: Union[float, None] = None, quantize: Union[int, None] = None
+    ) -> bytes:
+        """
+        Return a GeoJSON FeatureCollection assembled entirely by the database
+
+        This is a single query: features are built with `JsonFeature` and
+        combined with `json_agg`, and the result is returned as text
+        so nothing is parsed or validated in Python
+        """
+        features = self.annotate_features(simplify=simplify, quantize=quantize).values("feature")
+        try:
+            sql, params = features.query.sql_with_params()
+        except EmptyResultSet:
+            return b'{"type": "FeatureCollection", "features": []}'
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"""SELECT json_build_object(
+                    'type', 'FeatureCollection',
+                    'features', COALESCE(json_agg(features.feature), '[]'::json)
+                )::text FROM ({sql}) features""",
+                params,
+            )
+            return cursor.fetchone()[0].encode()
+
+    def to_response(self, simplify: Union[float, None] = None, quantize: Union[int, None] = None) -> HttpResponse:
+        """
+        Directly return a database assembled FeatureCollection as an HttpResponse
+        """
+        return HttpResponse(
+            content=self.to_featurecollection_json(simplify=simplify, quantize=quantize),
+            content_type="application/json",
+        )
+
+    def to_streaming_response(
+        self, simplify: Union[float, None] = None, quantize: Union[int, None] = None
+    ) -> StreamingHttpResponse:
+        """
+        Directly return a FeatureCollection as a StreamingHttpResponse
+        """
+        return StreamingHttpResponse(
+            self.iter_featurecollection(simplify=simplify, quantize=quantize), content_type="application/json"
+        )
+
+    def to_topology(self, simplify: Union[float, None] = None, quantization: int = 100000) -> Dict[str, Any]:
+        """
+        TopoJSON Topology for the queryset, built from the shared arcs in `Border`
+        so adjacent areas do not repeat their common boundary.
+        Arcs are simplified independently, which keeps their end points and so the topology.
+        """
+        areas = self.values("id", "parent", "code", "name", kind=models.F("kind__name"))
+        geom: Union[Transform, Simplify] = Transform("geom", 4326)
+        if simplify:
+            geom = Simplify(geom, simplify=simplify)
+        borders = (
+            self.model._meta.get_field("border")
+            .related_model.objects.filter(area_ids__overlap=list(self.values_list("pk", flat=True)))
+            .annotate(arc=AsGeoJSON(geom))
+            .values_list("area_ids", "arc")
+        )
+        return build_topology(
+            areas,
+            ((area_ids, json.loads(arc)["coordinates"]) for area_ids, arc in borders),
+            quantization=quantization,
+        )
+
 
 class FeatureManager(models.Manager):
     def get_queryset(self):
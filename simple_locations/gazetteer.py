@@ -0,0 +1,152 @@
+"""
+An in-memory index of area codes, names and the hierarchy
+
+Importers and integrations resolve many codes and names to areas. Rather
+than a query for each, the gazetteer reads the (non-spatial) columns of every
+Area once per process and answers from dicts:
+
+>>> gazetteer = get_gazetteer()
+>>> gazetteer.by_code("TL-DI").id
+>>> [place.id for place in gazetteer.by_name("díli", kind="municipality")]
+
+Hold on to the gazetteer for a batch of lookups: `get_gazetteer` returns the
+same instance until areas change. It is discarded when an Area or AreaType
+is saved or deleted in this process (see `simple_locations.signals`), and
+when a response cache is configured, when the hierarchy's cache scope is
+evicted by another process. Call `invalidate` after bulk updates.
+"""
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from simple_locations import cache
+
+
+class Place(NamedTuple):
+    id: int
+    code: str
+    name: str
+    kind: Optional[str]  # AreaType slug
+    kind_name: Optional[str]
+    parent_id: Optional[int]
+    level: int
+
+
+def normalise(name: str) -> str:
+    """
+    Case and accent insensitive form of a name, with whitespace collapsed
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).casefold().split())
+
+
+class Gazetteer:
+    def __init__(self, places: Iterable[Place], token: Optional[str] = None):
+        self.token = token
+        self.places: Dict[int, Place] = {}
+        self.codes: Dict[str, int] = {}
+        self.names: Dict[str, List[int]] = defaultdict(list)
+        for place in places:
+            self.places[place.id] = place
+            self.codes[place.code] = place.id
+            self.names[normalise(place.name)].append(place.id)
+
+    @classmethod
+    def load(cls, using: str = "default", token: Optional[str] = None) -> "Gazetteer":
+        from simple_locations.models import Area
+
+        rows = (
+            Area.lite.using(using)
+            .order_by()
+            .values_list("id", "code", "name", "kind__slug", "kind__name", "parent_id", "level")
+        )
+        return cls((Place(*row) for row in rows.iterator()), token=token)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def __contains__(self, area_id: int) -> bool:
+        return area_id in self.places
+
+    def get(self, area_id: int) -> Optional[Place]:
+        return self.places.get(area_id)
+
+    def _of_kind(self, ids: Iterable[int], kind: Optional[str]) -> List[Place]:
+        places = [self.places[i] for i in ids]
+        return places if kind is None else [place for place in places if place.kind == kind]
+
+    def by_code(self, code: str, kind: Optional[str] = None) -> Optional[Place]:
+        """
+        The area with a code, if it is of the `kind` slug when given.
+        Codes are unique across kinds.
+        """
+        area_id = self.codes.get(code)
+        places = self._of_kind([] if area_id is None else [area_id], kind)
+        return places[0] if places else None
+
+    def by_name(self, name: str, kind: Optional[str] = None) -> List[Place]:
+        """
+        Areas with a name (compared case and accent insensitively), optionally of a kind slug
+        """
+        return self._of_kind(self.names.get(normalise(name), ()), kind)
+
+    def children(self, area_id: Optional[int]) -> List[Place]:
+        return [place for place in self.places.values() if place.parent_id == area_id]
+
+    def ancestors(self, area_id: int, include_self: bool = False) -> List[Place]:
+        """
+        The ancestors of an area, from the root
+        """
+        ancestors = []
+        place = self.places.get(area_id)
+        if place is not None and include_self:
+            ancestors.append(place)
+        while place is not None and place.parent_id is not None:
+            place = self.places.get(place.parent_id)
+            if place is not None:
+                ancestors.append(place)
+        return list(reversed(ancestors))
+
+    def ancestor_at_level(self, area_id: int, level: int) -> Optional[Place]:
+        """
+        As `Area.get_ancestor_at_level`: the area itself if it is at or above the level
+        """
+        for place in self.ancestors(area_id, include_self=True):
+            if place.level == level:
+                return place
+        return self.places.get(area_id)
+
+
+_gazetteer: Optional[Gazetteer] = None
+_lock = threading.Lock()
+
+
+def _token() -> Optional[str]:
+    response_cache = cache.get_cache()
+    return cache.generation(response_cache, "tree", cache.ALL) if response_cache is not None else None
+
+
+def get_gazetteer() -> Gazetteer:
+    """
+    The process' gazetteer, loaded when first used or after areas have changed
+    """
+    global _gazetteer
+    token = _token()
+    gazetteer = _gazetteer
+    if gazetteer is not None and gazetteer.token == token:
+        return gazetteer
+    with _lock:
+        if _gazetteer is None or _gazetteer.token != token:
+            _gazetteer = Gazetteer.load(token=token)
+        return _gazetteer
+
+
+def invalidate() -> None:
+    """
+    Discard the process' gazetteer, and if a response cache is configured,
+    those of other processes
+    """
+    global _gazetteer
+    _gazetteer = None
+    cache.invalidate("tree", cache.ALL)
@@ -0,0 +1,57 @@
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from django.db import connections
+
+
+class Scripts:
+    locate = """
+        SELECT (
+            SELECT area.id FROM simple_locations_subdividedarea subdivided
+            JOIN simple_locations_area area ON area.id = subdivided.area_id
+            LEFT JOIN simple_locations_areatype areatype ON areatype.id = area.kind_id
+            WHERE ST_Intersects(subdivided.geom, ST_SetSRID(ST_MakePoint(point.lon, point.lat), 4326))
+            AND (%(kind)s::text IS NULL OR areatype.slug = %(kind)s)
+            AND (%(level)s::int IS NULL OR area.level = %(level)s)
+            ORDER BY area.level DESC
+            LIMIT 1
+        )
+        FROM unnest(%(lons)s::float8[], %(lats)s::float8[]) WITH ORDINALITY AS point(lon, lat, n)
+        ORDER BY point.n
+    """
+
+
+def locate(
+    points: Iterable[Tuple[float, float]],
+    kind: Optional[str] = None,
+    level: Optional[int] = None,
+    batch_size: int = 50000,
+    using: str = "default",
+) -> List[Optional[int]]:
+    """
+    Bulk reverse geocoding: the id of the deepest area (optionally of a kind slug
+    or tree level) containing each (lon, lat) point in EPSG:4326, or None.
+
+    Points are sent to PostGIS as arrays, `batch_size` at a time, and joined to
+    areas using the spatial index on `SubdividedArea.geom`
+
+    >>> locate([(125.57, -8.56), (125.6, -8.5)], kind="suco")
+    """
+    located: List[Optional[int]] = []
+    batch: List[Tuple[float, float]] = []
+    with connections[using].cursor() as cursor:
+
+        def flush(batch: Sequence[Tuple[float, float]]):
+            cursor.execute(
+                Scripts.locate,
+                dict(lons=[p[0] for p in batch], lats=[p[1] for p in batch], kind=kind, level=level),
+            )
+            located.extend(row[0] for row in cursor.fetchall())
+
+        for point in points:
+            batch.append(point)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    return located
@@ -0,0 +1,46 @@
+"""
+Geometry preparation for imports, run in worker processes
+
+This module only depends on GEOS and GDAL so that it can be imported
+by processes which have not set up Django.
+"""
+from functools import lru_cache
+from typing import Optional, Union
+
+from django.contrib.gis.gdal import CoordTransform, SpatialReference
+from django.contrib.gis.gdal.error import GDALException, SRSException
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Polygon
+from django.contrib.gis.geos.error import GEOSException
+
+
+@lru_cache(maxsize=16)
+def coord_transform(source_srs: Union[int, str], srid: int) -> CoordTransform:
+    """
+    The transformation from an SRID, or WKT or PROJ definition, to `srid`.
+    Cached as every feature of a layer shares its spatial reference.
+    """
+    return CoordTransform(SpatialReference(source_srs), SpatialReference(srid))
+
+
+def prepare_geometry(wkb: bytes, source_srs: Union[int, str, None], srid: int = 4326) -> Optional[bytes]:
+    """
+    Parse, transform, repair and coerce a feature's geometry to a MultiPolygon.
+    `source_srs` is the SRID, or WKT for a spatial reference without an EPSG code,
+    of the feature's layer; a layer without one is assumed to be in `srid`.
+    Returns its WKB, or None if it is not a valid (multi)polygon or its
+    spatial reference cannot be read.
+    """
+    try:
+        geom = GEOSGeometry(memoryview(wkb))
+        if source_srs is not None and source_srs != srid:
+            geom.transform(coord_transform(source_srs, srid))
+        geom.srid = srid
+        if not geom.valid:
+            geom = geom.buffer(0)
+        if isinstance(geom, Polygon):
+            geom = MultiPolygon(geom, srid=srid)
+        if not isinstance(geom, MultiPolygon) or geom.empty:
+            return None
+        return bytes(geom.wkb)
+    except (GDALException, GEOSException, SRSException, ValueError):
+        return None
@@ -1,4 +1,4 @@
-from typing import List, Optional, TypeVar, Union
+from typing import List, Optional, Tuple, TypeVar, Union
 
 # We import this and then cast to JSON in the db. The default function returns text.
 from django.contrib.gis.db.models.functions import AsGeoJSON as AsGeoJson_
@@ -7,6 +7,21 @@ from django.db.models import F, Func, Value
 from django.db.models.fields.json import JSONField
 from django.db.models.functions.comparison import JSONObject
 
+# Simplification tolerances (in degrees) offered by the API.
+# Geometries for each non-zero level are stored in `SimplifiedArea`
+SIMPLIFICATION_LEVELS: Tuple[float, ...] = (0.0, 0.0001, 0.001, 0.01, 0.1, 0.5)
+
+BBox = Tuple[float, float, float, float]
+
+
+def bbox_simplification(bbox: BBox, resolution: int = 1024) -> float:
+    """
+    The coarsest simplification level which is finer than one pixel
+    when the bounding box (xmin, ymin, xmax, ymax) is shown `resolution` pixels wide
+    """
+    pixel = max(bbox[2] - bbox[0], bbox[3] - bbox[1]) / resolution
+    return max((level for level in SIMPLIFICATION_LEVELS if level <= pixel), default=SIMPLIFICATION_LEVELS[0])
+
 
 class Quantize(models.Func):
     """
@@ -76,7 +91,8 @@ class JsonFeature(models.Func):
         self,
         # These are optional geometry processing functions which affect the
         # geometry before it's converted to GeoJSON
-        geom_field: str = "geom",
+        # A field name, or an expression such as a subquery for a stored geometry
+        geom_field: Union[str, F, Func] = "geom",
         simplify: Optional[float] = None,
         quantize: Optional[int] = None,
         multi: Optional[bool] = False,
@@ -96,7 +112,7 @@ class JsonFeature(models.Func):
         expressions: List[Union[Value, F, Func]] = []
         if include_id_field:
             expressions.extend((Value("id"), models.F("pk")))
-        g: Union[F, Func] = models.F(geom_field)
+        g: Union[F, Func] = models.F(geom_field) if isinstance(geom_field, str) else geom_field
         if simplify:
             g = SimplifyPreserve(g, simplify=simplify)
         if quantize:
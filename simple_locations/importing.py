@@ -0,0 +1,700 @@
+"""
+Bulk import of areas from vector data sources
+
+Features are read lazily from a GDAL `DataSource` layer and written in
+batches: codes which already exist are found with one query per batch and
+new areas are written with `bulk_create`, with MPTT updates disabled.
+The tree is rebuilt once at the end.
+
+As `bulk_create` does not send signals, the stored simplified and subdivided
+geometries of new areas are refreshed per batch, and caches are evicted
+once the import commits.
+
+>>> stats = import_areas(read_features("provinces.shp"), area_type, name_field="NAME", code_field="CODE")
+>>> print(stats)
+
+`import_sources` imports several files described by a mapping (see `load_mapping`),
+preparing geometries in a process pool and linking parents by code.
+`link_parents_by_prefix` links the areas already stored whose parent's code is a prefix
+of their own, with one `UPDATE ... FROM` statement and a single tree rebuild.
+`link_parents_by_containment` does the same for data without coded parents,
+from the overlap of each area with the areas of the type above it.
+
+Each imported area stores a fingerprint of its geometry, name and parent code.
+A differential import compares fingerprints to update only the areas which
+changed, and deletes areas of the imported types which are no longer present.
+The `ImportStats.changes` of an import list the areas created, updated and deleted.
+"""
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    TypeVar,
+    Union,
+)
+
+from django.contrib.gis.gdal import DataSource  # type: ignore
+from django.contrib.gis.gdal.error import GDALException
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon
+from django.contrib.gis.geos.error import GEOSException
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from simple_locations import cache, gazetteer
+from simple_locations.geometry import prepare_geometry
+from simple_locations.models import (
+    Area,
+    AreaType,
+    ProjectedArea,
+    SimplifiedArea,
+    SubdividedArea,
+    SubdividedProjectedArea,
+)
+
+T = TypeVar("T")
+
+
+class Scripts:
+    # `Area.code` is unique, so each code identifies at most one parent.
+    # The previous parents, joined as `previous`, are returned to evict their cached children.
+    link_parents = """
+        UPDATE simple_locations_area child
+        SET parent_id = parent.id, last_modified = now()
+        FROM unnest(%(ids)s::int[], %(codes)s::text[]) AS link(id, code)
+        JOIN simple_locations_area parent ON parent.code = link.code
+        JOIN simple_locations_area previous ON previous.id = link.id
+        WHERE child.id = link.id
+        AND child.id <> parent.id
+        AND child.parent_id IS DISTINCT FROM parent.id
+        RETURNING child.id, previous.parent_id
+    """
+
+    link_parents_by_prefix = """
+        UPDATE simple_locations_area child
+        SET parent_id = parent.id, last_modified = now()
+        FROM simple_locations_area parent
+        LEFT JOIN simple_locations_areatype parenttype ON parenttype.id = parent.kind_id,
+        simple_locations_area previous
+        WHERE previous.id = child.id
+        AND length(child.code) > %(strip)s
+        AND parent.code = left(child.code, -%(strip)s)
+        AND child.id <> parent.id
+        AND child.parent_id IS DISTINCT FROM parent.id
+        AND (%(parent_kinds)s::text[] IS NULL OR parenttype.slug = ANY(%(parent_kinds)s::text[]))
+        AND (
+            %(kinds)s::text[] IS NULL
+            OR child.kind_id IN (SELECT id FROM simple_locations_areatype WHERE slug = ANY(%(kinds)s::text[]))
+        )
+        RETURNING child.id, previous.parent_id
+    """
+
+    # Each area of a kind is linked to the area of the kind above it which covers the most of it.
+    # Candidates are found with the GiST index on `Area.geom`, so are joined from the table rather
+    # than the (materialized) `typed` CTE. The intersection is only computed for candidates which
+    # do not cover the area; candidates which only touch its boundary are dropped, and ties go to
+    # the candidate containing its point on surface.
+    link_parents_by_containment = """
+        WITH rank AS (
+            SELECT slug, n FROM unnest(%(kinds)s::text[]) WITH ORDINALITY AS rank(slug, n)
+        ),
+        typed AS (
+            SELECT area.id, area.code, area.geom, area.parent_id, rank.n
+            FROM simple_locations_area area
+            JOIN simple_locations_areatype areatype ON areatype.id = area.kind_id
+            JOIN rank ON rank.slug = areatype.slug
+        ),
+        candidate AS (
+            SELECT
+                child.id AS child_id,
+                parent.id AS parent_id,
+                CASE
+                    WHEN ST_Covers(parent.geom, child.geom) THEN 1.0::float8
+                    ELSE ST_Area(ST_Intersection(parent.geom, child.geom)) / NULLIF(ST_Area(child.geom), 0)
+                END AS share,
+                ST_Intersects(parent.geom, ST_PointOnSurface(child.geom)) AS contains_point
+            FROM typed child
+            JOIN simple_locations_area parent ON parent.geom && child.geom AND ST_Intersects(parent.geom, child.geom)
+            JOIN simple_locations_areatype parenttype ON parenttype.id = parent.kind_id
+            JOIN rank parentrank ON parentrank.slug = parenttype.slug AND parentrank.n = child.n - 1
+        ),
+        best AS (
+            SELECT * FROM (
+                SELECT
+                    candidate.*,
+                    row_number() OVER w AS position,
+                    lead(parent_id) OVER w AS runner_up_id,
+                    lead(share) OVER w AS runner_up_share
+                FROM candidate
+                WHERE share > 0
+                WINDOW w AS (PARTITION BY child_id ORDER BY share DESC, contains_point DESC, parent_id)
+            ) ranked
+            WHERE position = 1
+        ),
+        linked AS (
+            UPDATE simple_locations_area area
+            SET parent_id = best.parent_id, last_modified = now()
+            FROM best
+            WHERE area.id = best.child_id
+            AND area.parent_id IS DISTINCT FROM best.parent_id
+            RETURNING area.id
+        )
+        SELECT
+            child.id, child.code, best.parent_id, best.share, best.runner_up_id, best.runner_up_share,
+            child.parent_id, child.id IN (SELECT id FROM linked)
+        FROM typed child
+        LEFT JOIN best ON best.child_id = child.id
+        WHERE child.n > 1
+        ORDER BY child.id
+    """
+
+
+class ImportStats:
+    """
+    Counts of features read and areas written, with throughput
+    """
+
+    def __init__(self):
+        self.read = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+        self.skipped = 0
+        self.failed = 0
+        # Codes already used by an area of another kind
+        self.conflicts = 0
+        self.started = time.monotonic()
+        self.changes: Dict[str, List[Dict[str, Any]]] = {"created": [], "updated": [], "deleted": [], "conflicts": []}
+
+    def change(self, change: str, areas: Iterable[Area]) -> None:
+        self.changes[change].extend({"id": area.pk, "code": area.code, "kind": area.kind_id} for area in areas)
+
+    @property
+    def affected(self) -> List[int]:
+        """
+        The ids of areas created, updated or deleted
+        """
+        return [area["id"] for change in ("created", "updated", "deleted") for area in self.changes[change]]
+
+    def report(self) -> Dict[str, Any]:
+        counts = ("read", "created", "updated", "unchanged", "deleted", "skipped", "failed", "conflicts")
+        return {**{count: getattr(self, count) for count in counts}, "changes": self.changes}
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        """
+        Features read per second
+        """
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.read} read, {self.created} created, {self.updated} updated, {self.unchanged} unchanged, "
+            f"{self.deleted} deleted, {self.skipped} skipped, {self.failed} failed, {self.conflicts} conflicts "
+            f"in {self.elapsed:.1f}s ({self.rate:.0f} features/s)"
+        )
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def read_features(path: Union[str, Path], layer: int = 0) -> Iterator:
+    """
+    The features of a layer of a vector file, read as they are iterated
+    """
+    yield from DataSource(str(path))[layer]
+
+
+def feature_geometry(feature, srid: int = 4326) -> MultiPolygon:
+    """
+    A feature's geometry as a MultiPolygon in `srid`
+    """
+    geometry = feature.geom
+    if geometry.srid != srid:
+        geometry.transform(srid)
+    geom = GEOSGeometry(geometry.wkb, srid=srid)
+    # A Shapefile may contain a data type which we don't cover (like a Polygon)
+    return geom if isinstance(geom, MultiPolygon) else MultiPolygon(geom, srid=srid)
+
+
+def fingerprint(wkb: bytes, *attributes: Optional[str]) -> str:
+    """
+    A hash of an area's geometry (as prepared for import) and attributes
+    """
+    digest = hashlib.sha256(wkb)
+    for attribute in attributes:
+        digest.update(b"\0" + (attribute or "").encode())
+    return digest.hexdigest()
+
+
+def refresh_areas(area_ids: List[int]) -> None:
+    """
+    What the Area signals do on save to the stored geometries, for areas written in bulk.
+    Projected geometries are refreshed if they are in use. Evict caches with `evict_on_commit`.
+    """
+    SimplifiedArea.objects.refresh(area_ids)
+    SubdividedArea.objects.refresh(area_ids)
+    if ProjectedArea.objects.exists():
+        ProjectedArea.objects.refresh(area_ids)
+        SubdividedProjectedArea.objects.refresh(area_ids)
+
+
+def evict_on_commit(
+    area_ids: Iterable[int], previous_parent_ids: Iterable[Optional[int]] = (), using: str = "default"
+) -> None:
+    """
+    Once the transaction commits, evict the cached responses of areas and their
+    descendants (whose tree fields change when the tree is rebuilt), of their
+    previous parents, and the gazetteer. Evicting before the commit would let
+    other processes cache the old rows again.
+    """
+    from simple_locations.signals import evict_areas
+
+    area_ids, previous_parent_ids = list(area_ids), list(previous_parent_ids)
+
+    def evict():
+        areas = Area.objects.using(using)
+        ancestors = areas.filter(
+            pk__in=area_ids, tree_id=OuterRef("tree_id"), lft__lte=OuterRef("lft"), rght__gte=OuterRef("rght")
+        )
+        evict_areas(areas.filter(Exists(ancestors)))
+        cache.invalidate("parent", *previous_parent_ids)
+        gazetteer.invalidate()
+
+    transaction.on_commit(evict, using=using)
+
+
+def new_area(**fields) -> Area:
+    """
+    An unsaved Area with placeholder tree fields, as `MPTTModel.save` sets with updates disabled
+    """
+    return Area(lft=1, rght=2, level=0, tree_id=0, **fields)
+
+
+def write_areas(
+    areas: Dict[str, Area], stats: ImportStats, kind: Optional[AreaType] = None, differential: bool = False
+) -> List[Area]:
+    """
+    Bulk create areas, by code, unless an area with the code exists.
+    When `differential`, existing areas of `kind` with a different fingerprint are updated instead.
+    Codes are unique across kinds: codes held by an area of another kind are counted as conflicts.
+    Returns the areas created and updated.
+    """
+    existing = {
+        code: (pk, kind_id, stored)
+        for code, pk, kind_id, stored in Area.objects.filter(code__in=list(areas)).values_list(
+            "code", "pk", "kind_id", "fingerprint"
+        )
+    }
+    if kind is not None:
+        conflicts = [
+            Area(pk=pk, code=code, kind_id=kind_id)
+            for code, (pk, kind_id, stored) in existing.items()
+            if kind_id != kind.pk
+        ]
+        stats.conflicts += len(conflicts)
+        stats.change("conflicts", conflicts)
+        existing = {code: value for code, value in existing.items() if value[1] == kind.pk}
+
+    created = Area.objects.bulk_create([area for code, area in areas.items() if code not in existing])
+    stats.created += len(created)
+    stats.change("created", created)
+    updated = []
+    if differential:
+        modified = timezone.now()
+        for code, area in areas.items():
+            if code not in existing:
+                continue
+            area.pk, kind_id, stored = existing[code]
+            if area.fingerprint == stored:
+                stats.unchanged += 1
+                continue
+            area.last_modified = modified
+            updated.append(area)
+        Area.objects.bulk_update(updated, ["name", "geom", "fingerprint", "last_modified"])
+        stats.updated += len(updated)
+        stats.change("updated", updated)
+    else:
+        stats.skipped += len(existing)
+
+    if created or updated:
+        refresh_areas([area.pk for area in created + updated])
+    return created + updated
+
+
+def create_areas(
+    features: Iterable,
+    area_type: AreaType,
+    name_field: str,
+    code_field: str,
+    batch_size: int = 500,
+    srid: int = 4326,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+    stats: Optional[ImportStats] = None,
+) -> ImportStats:
+    """
+    Create an area of `area_type` for each feature with a code not already in use.
+    Call inside `Area.objects.disable_mptt_updates()` and rebuild the tree after;
+    `import_areas` does both.
+    """
+    stats = stats or ImportStats()
+    for batch in batched(features, batch_size):
+        areas = {}
+        for feature in batch:
+            stats.read += 1
+            code = str(feature.get(code_field))
+            if code in areas:
+                stats.skipped += 1
+                continue
+            try:
+                geom = feature_geometry(feature, srid)
+            except (GDALException, GEOSException):
+                stats.failed += 1
+                continue
+            name = feature.get(name_field)
+            areas[code] = new_area(
+                name=name, code=code, kind=area_type, geom=geom, fingerprint=fingerprint(bytes(geom.wkb), name)
+            )
+        write_areas(areas, stats)
+        if progress:
+            progress(stats)
+    return stats
+
+
+def import_areas(
+    features: Iterable,
+    area_type: AreaType,
+    name_field: str,
+    code_field: str,
+    batch_size: int = 500,
+    srid: int = 4326,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+) -> ImportStats:
+    """
+    Create areas from features in a transaction, then rebuild the tree
+    """
+    with transaction.atomic():
+        with Area.objects.disable_mptt_updates():
+            stats = create_areas(features, area_type, name_field, code_field, batch_size, srid, progress)
+        Area.objects.rebuild()
+        evict_on_commit(stats.affected)
+    return stats
+
+
+class ParentRule(NamedTuple):
+    """
+    How the code of an area's parent is found: from a feature `field`,
+    or by removing `strip` trailing characters from the area's code
+    """
+
+    field: Optional[str] = None
+    strip: int = 0
+
+    def parent_code(self, code: str, feature) -> Optional[str]:
+        if self.field:
+            value = feature.get(self.field)
+            return str(value) if value not in (None, "") else None
+        if self.strip and len(code) > self.strip:
+            return code[: -self.strip]
+        return None
+
+
+class Source(NamedTuple):
+    """
+    The mapping of a file's features to areas
+    """
+
+    areatype: str
+    name: str  # Field names
+    code: str
+    parent_code: ParentRule = ParentRule()
+    layer: int = 0
+
+
+def load_mapping(path: Union[str, Path]) -> Dict[str, Source]:
+    """
+    Read a JSON mapping of file names to their `Source`, like `import_dird.area_definition_set`:
+
+    {
+        "provinces.shp": {"areatype": "province", "name": "PROVNAME", "code": "PROVID"},
+        "districts.geojson": {"areatype": "district", "name": "DISTNAME", "code": "GEOCODE", "parent_code": {"strip": 2}},
+        "llgs.gpkg": {"areatype": "llg", "name": "LLGNAME", "code": "GEOCODE", "parent_code": {"field": "DISTCODE"}}
+    }
+    """
+    with open(path) as mapping_file:
+        mapping = json.load(mapping_file)
+    return {
+        filename: Source(**{**definition, "parent_code": ParentRule(**definition.get("parent_code", {}))})
+        for filename, definition in mapping.items()
+    }
+
+
+class Record(NamedTuple):
+    """
+    The attributes and geometry of a feature
+    """
+
+    code: str
+    name: str
+    parent_code: Optional[str]
+    wkb: bytes
+    # The SRID of the layer, or the WKT of a spatial reference without an EPSG code
+    srs: Union[int, str, None]
+
+
+def read_records(path: Union[str, Path], source: Source) -> Iterator[Record]:
+    layer = DataSource(str(path))[source.layer]
+    # Read once: every feature shares the spatial reference of its layer
+    srs = None if layer.srs is None else layer.srs.srid or layer.srs.wkt
+    for feature in layer:
+        code = str(feature.get(source.code))
+        yield Record(
+            code,
+            feature.get(source.name),
+            source.parent_code.parent_code(code, feature),
+            bytes(feature.geom.wkb),
+            srs,
+        )
+
+
+def _linked(cursor, using: str) -> int:
+    """
+    Evict the areas whose parents were set by a `Scripts` statement once the transaction commits
+    """
+    rows = cursor.fetchall()
+    evict_on_commit([row[0] for row in rows], [row[1] for row in rows], using=using)
+    return len(rows)
+
+
+def link_parents(parent_codes: Dict[int, str], using: str = "default") -> int:
+    """
+    Set the parents of areas (by id) from the codes of their parents in one
+    statement.
+    Returns the number of areas linked. Rebuild the tree after.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(Scripts.link_parents, dict(ids=list(parent_codes), codes=list(parent_codes.values())))
+        return _linked(cursor, using)
+
+
+def link_parents_by_prefix(
+    strip: int = 2,
+    kinds: Optional[Iterable[str]] = None,
+    parent_kinds: Optional[Iterable[str]] = None,
+    rebuild: bool = True,
+    using: str = "default",
+) -> int:
+    """
+    Set the parent of every area (optionally of the `kinds` slugs) to the area
+    whose code is its own without the last `strip` characters (optionally of
+    the `parent_kinds` slugs), in one statement, then rebuild the tree once.
+    Caches and the gazetteer are evicted on commit, even when not `rebuild`ing.
+    Returns the number of areas linked.
+
+    >>> link_parents_by_prefix(strip=2, kinds=["district", "llg"])
+    """
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                Scripts.link_parents_by_prefix,
+                dict(
+                    strip=strip,
+                    kinds=None if kinds is None else list(kinds),
+                    parent_kinds=None if parent_kinds is None else list(parent_kinds),
+                ),
+            )
+            linked = _linked(cursor, using)
+        if rebuild:
+            Area.objects.db_manager(using).rebuild()
+    return linked
+
+
+class Containment(NamedTuple):
+    """
+    The parent chosen for an area by `link_parents_by_containment`
+    """
+
+    area_id: int
+    code: str
+    parent_id: Optional[int]
+    share: Optional[float]  # Of the area covered by its parent
+    runner_up_id: Optional[int]
+    runner_up_share: Optional[float]
+    previous_parent_id: Optional[int]
+    linked: bool  # False if the parent was already set
+
+
+class ContainmentReport(NamedTuple):
+    linked: int
+    # Areas whose parent covers less than the minimum share of them
+    ambiguous: List[Containment]
+    # Areas which do not intersect any area of the kind above
+    unassigned: List[Containment]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "linked": self.linked,
+            "ambiguous": [area._asdict() for area in self.ambiguous],
+            "unassigned": [area._asdict() for area in self.unassigned],
+        }
+
+
+def link_parents_by_containment(
+    kinds: Sequence[str], min_share: float = 0.9, rebuild: bool = True, using: str = "default"
+) -> ContainmentReport:
+    """
+    Set the parent of every area of the `kinds` slugs, given from the top of the
+    hierarchy down, to the area of the kind above it which covers the largest
+    share of it, with one spatial join, then rebuild the tree once.
+    Assignments where the parent covers less than `min_share` of the area are reported.
+
+    >>> report = link_parents_by_containment(["province", "district", "llg"])
+    >>> [(area.code, area.share, area.runner_up_id) for area in report.ambiguous]
+    """
+    with transaction.atomic(using=using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(Scripts.link_parents_by_containment, dict(kinds=list(kinds)))
+            areas = [Containment(*row) for row in cursor.fetchall()]
+        linked = [area for area in areas if area.linked]
+        evict_on_commit([area.area_id for area in linked], [area.previous_parent_id for area in linked], using=using)
+        if rebuild:
+            Area.objects.db_manager(using).rebuild()
+    return ContainmentReport(
+        linked=len(linked),
+        ambiguous=[area for area in areas if area.parent_id is not None and (area.share or 0) < min_share],
+        unassigned=[area for area in areas if area.parent_id is None],
+    )
+
+
+def delete_missing(seen: Dict[int, Set[str]], stats: ImportStats) -> None:
+    """
+    Delete areas of each type (by id) whose code is not in `seen`, and their descendants.
+    Their cached responses and the gazetteer are evicted once the transaction commits.
+    """
+    from simple_locations.signals import suppress_eviction
+
+    deleted: List[Area] = []
+    for kind_id, codes in seen.items():
+        fields = ("pk", "code", "kind", "parent")
+        missing = list(Area.objects.filter(kind_id=kind_id).exclude(code__in=codes).only(*fields))
+        # Tree fields are not maintained during an import, so descendants are found by parent
+        parents = missing
+        while parents:
+            parents = list(Area.objects.filter(parent__in=parents).only(*fields))
+            missing.extend(parents)
+        if missing:
+            stats.change("deleted", missing)
+            deleted.extend(missing)
+    if not deleted:
+        return
+
+    ids = [area.pk for area in deleted]
+    # Read before the rows are deleted: the receivers would evict before the commit
+    parent_ids = {area.parent_id for area in deleted}
+    slugs = list(AreaType.objects.filter(pk__in={area.kind_id for area in deleted}).values_list("slug", flat=True))
+    with suppress_eviction():
+        stats.deleted += Area.objects.filter(pk__in=ids).delete()[1][Area._meta.label]
+
+    def evict():
+        cache.invalidate("id", *ids)
+        cache.invalidate("parent", *parent_ids, *ids)
+        cache.invalidate("type", *slugs)
+        gazetteer.invalidate()
+
+    transaction.on_commit(evict)
+
+
+def import_sources(
+    paths: Iterable[Union[str, Path]],
+    mapping: Dict[str, Source],
+    srid: int = 4326,
+    workers: Optional[int] = None,
+    batch_size: int = 500,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+    differential: bool = False,
+) -> ImportStats:
+    """
+    Import areas from files described by `mapping` (by file name), preparing
+    geometries with a pool of `workers` processes (by default, one per CPU).
+    Parents are linked by code after every file is read, then the tree is
+    rebuilt once, in a single transaction.
+
+    When `differential`, areas whose fingerprint changed are updated, and areas
+    of the imported types which are not in the files are deleted.
+    """
+    stats = ImportStats()
+    parent_codes: Dict[int, str] = {}
+    seen: Dict[int, Set[str]] = {}
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool, transaction.atomic():
+        with Area.objects.disable_mptt_updates():
+            for path in map(Path, paths):
+                source = mapping[path.name]
+                area_type = AreaType.objects.get_or_create(slug=source.areatype, defaults={"name": source.areatype})[0]
+                codes = seen.setdefault(area_type.pk, set())
+                # Workers are given several batches at a time to keep every process busy
+                for records in batched(read_records(path, source), batch_size * workers):
+                    prepared = pool.map(
+                        prepare_geometry,
+                        [record.wkb for record in records],
+                        [record.srs for record in records],
+                        repeat(srid),
+                        chunksize=max(1, len(records) // (workers * 4)),
+                    )
+                    areas: Dict[str, Area] = {}
+                    parents: Dict[str, str] = {}
+                    for record, wkb in zip(records, prepared):
+                        stats.read += 1
+                        if wkb is None:
+                            stats.failed += 1
+                        elif record.code in areas:
+                            stats.skipped += 1
+                        else:
+                            geom = GEOSGeometry(memoryview(wkb), srid=srid)
+                            areas[record.code] = new_area(
+                                name=record.name,
+                                code=record.code,
+                                kind=area_type,
+                                geom=geom,
+                                fingerprint=fingerprint(wkb, record.name, record.parent_code),
+                            )
+                            if record.parent_code:
+                                parents[record.code] = record.parent_code
+                    # Areas which failed to prepare are kept as they are
+                    codes.update(record.code for record in records)
+                    for area in write_areas(areas, stats, kind=area_type, differential=differential):
+                        if area.code in parents:
+                            parent_codes[area.pk] = parents[area.code]
+                    if progress:
+                        progress(stats)
+            link_parents(parent_codes)
+            if differential:
+                delete_missing(seen, stats)
+        Area.objects.rebuild()
+        evict_on_commit(stats.affected)
+    return stats
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from simple_locations import artifacts
+
+
+class Command(BaseCommand):
+    help = "Build gzip / brotli compressed by-type and by-parent GeoJSON responses into the response cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--quantize",
+            nargs="+",
+            type=int,
+            default=list(artifacts.DEFAULT_QUANTIZE),
+            help="Quantize values to build for each simplification level",
+        )
+        parser.add_argument(
+            "--encoding",
+            nargs="+",
+            choices=list(artifacts.ENCODERS),
+            default=list(artifacts.ENCODERS),
+            help="Encodings to precompress",
+        )
+
+    def handle(self, *args, **options):
+        if artifacts.brotli is None:
+            self.stdout.write(self.style.WARNING("brotli is not installed (see the brotli extra): skipping br"))
+        encodings = ", ".join(options["encoding"])
+        self.stdout.write(self.style.NOTICE(f"Building GeoJSON responses ({encodings})"))
+        start = time.monotonic()
+        count = artifacts.build(quantize_values=options["quantize"], encodings=options["encoding"])
+        self.stdout.write(self.style.SUCCESS(f"Built {count} responses in {time.monotonic() - start:.1f}s"))
@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.db import connection
 
+from simple_locations.signals import evict_borders
+
 
 class Scripts:
     init_topology = """
@@ -160,4 +162,6 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(Scripts.remove_topology))
             c.execute(Scripts.remove_topology)
 
+        # The borders were rewritten in SQL so no signals were sent
+        evict_borders()
         # raise NotImplementedError()
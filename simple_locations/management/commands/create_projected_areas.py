@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.db import connection
 
+from simple_locations.models import SubdividedProjectedArea
+
 
 class Scripts:
     populate_simple_locations_projectedarea = """
@@ -20,3 +22,4 @@ class Command(BaseCommand):
         with connection.cursor() as c:
             self.stdout.write(self.style.SUCCESS(Scripts.populate_simple_locations_projectedarea))
             c.execute(Scripts.populate_simple_locations_projectedarea)
+        SubdividedProjectedArea.objects.refresh()
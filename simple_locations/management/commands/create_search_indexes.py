@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from simple_locations.models import Area, AreaType
+from simple_locations.search import create_trigram_indexes
+
+
+class Command(BaseCommand):
+    help = "Create trigram indexes for the translated name columns of Area and AreaType"
+
+    def handle(self, *args, **options):
+        for model in (Area, AreaType):
+            for name in create_trigram_indexes(model):
+                self.stdout.write(self.style.SUCCESS(f"Created {name}"))
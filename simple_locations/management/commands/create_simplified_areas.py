@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from simple_locations.gis_functions import SIMPLIFICATION_LEVELS
+from simple_locations.models import SimplifiedArea
+
+
+class Command(BaseCommand):
+    help = "(Re)build the stored simplified geometries for every Area"
+
+    def handle(self, *args, **options):
+        levels = ", ".join(str(level) for level in SIMPLIFICATION_LEVELS if level)
+        self.stdout.write(self.style.SUCCESS(f"Simplifying areas at levels: {levels}"))
+        SimplifiedArea.objects.refresh()
+        self.stdout.write(self.style.SUCCESS(f"{SimplifiedArea.objects.count()} simplified areas created"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from simple_locations.manager import SUBDIVIDE_MAX_VERTICES
+from simple_locations.models import SubdividedArea, SubdividedProjectedArea
+
+
+class Command(BaseCommand):
+    help = "(Re)build the subdivided geometries used for spatial lookups against Area and ProjectedArea"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-vertices",
+            type=int,
+            default=SUBDIVIDE_MAX_VERTICES,
+            help="The largest number of vertices in a subdivided geometry",
+        )
+
+    def handle(self, *args, **options):
+        for model in (SubdividedArea, SubdividedProjectedArea):
+            model.objects.refresh(max_vertices=options["max_vertices"])
+            self.stdout.write(self.style.SUCCESS(f"{model.objects.count()} {model._meta.verbose_name}s created"))
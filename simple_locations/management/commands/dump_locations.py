@@ -8,7 +8,7 @@ class Command(BaseCommand):
 
     def handle(self, **options):
         print("id\tname\ttype\tparent_id\tparent_name\tparent_type")
-        for a in Area.objects.all():
+        for a in Area.lite.select_related("kind", "parent__kind").defer("parent__geom"):
             print(
                 "%d\t%s\t%s\t%d\t%s\t%s"
                 % (
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+
+from simple_locations.importing import ImportStats, import_sources, load_mapping
+
+
+class Command(BaseCommand):
+    help = """Import areas from local shapefile, GeoJSON or GeoPackage files described by a JSON mapping file"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", type=Path, help="Files to import, in order")
+        parser.add_argument(
+            "--mapping",
+            required=True,
+            type=Path,
+            help="JSON file of the area type, name field, code field and parent code rule of each file name",
+        )
+        parser.add_argument("--workers", type=int, default=None, help="Geometry processes (default: one per CPU)")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--srid", type=int, default=4326)
+        parser.add_argument(
+            "--differential",
+            action="store_true",
+            help="Update changed areas and delete areas of the imported types which are not in the files",
+        )
+        parser.add_argument("--report", type=Path, help="Write the areas created, updated and deleted to a JSON file")
+
+    def handle(self, *args: Any, **options: Any):
+        mapping = load_mapping(options["mapping"])
+        missing = [str(path) for path in options["paths"] if path.name not in mapping]
+        if missing:
+            raise CommandError(f"No mapping for {', '.join(missing)}")
+
+        def progress(stats: ImportStats):
+            self.stderr.write(self.style.NOTICE(str(stats)))
+
+        stats = import_sources(
+            options["paths"],
+            mapping,
+            srid=options["srid"],
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            progress=progress,
+            differential=options["differential"],
+        )
+        if options["report"]:
+            options["report"].write_text(json.dumps(stats.report(), indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Imported: {stats}"))
@@ -4,15 +4,20 @@ import tempfile
 import urllib
 import zipfile
 from pathlib import Path
-from typing import Any, List, NamedTuple
-from warnings import warn
+from typing import Any, List, NamedTuple, Optional
 
 from django.contrib.gis.db.models import Union
-from django.contrib.gis.gdal import DataSource  # type: ignore
-from django.contrib.gis.geos import GEOSGeometry, MultiPolygon
 from django.core.management.base import BaseCommand
-from django.db import IntegrityError
-
+from django.db import transaction
+
+from simple_locations.gazetteer import get_gazetteer
+from simple_locations.importing import (
+    ImportStats,
+    create_areas,
+    evict_on_commit,
+    link_parents_by_prefix,
+    read_features,
+)
 from simple_locations.models import Area, AreaType
 
 
@@ -63,57 +68,44 @@ class Command(BaseCommand):
 
     def import_directory(self, tmpdirname: str):
         self.stderr.write(self.style.NOTICE("Importing shapes"))
-        for filename in [f for f in os.listdir(tmpdirname) if f.endswith(".shp")]:
-            area_definition = area_definition_set[filename]
-            area_type = AreaType.objects.get_or_create(
-                name=area_definition["areatype"],
-                slug=area_definition["areatype"],
-            )[
-                0
-            ]  # type: AreaType
-            self.stderr.write(self.style.NOTICE(f"Importing {tmpdirname} / {filename}"))
-            self.import_shp(
-                shape_path=Path(tmpdirname) / filename,
-                area_type=area_type,
-                field_mapping=area_definition,
-            )
-
-    def import_shp(self, shape_path: Path, area_type: AreaType, field_mapping: dict) -> None:
-        for feature in DataSource(str(shape_path))[0]:
-            self.import_feature(feature=feature, area_type=area_type, field_mapping=field_mapping)
-
-    def import_feature(
-        self,
-        feature,
-        area_type: AreaType,
-        field_mapping: dict,
-        database_srid: int = 4326,
-    ):
-        # Transform the geometry to a MultiPolygon if it is a Single Polygon
-        # This is because a Shapefile may contain a data type which we don't cover (like a Polygon)
-        geom = feature.geom.geos if isinstance(feature.geom.geos, MultiPolygon) else MultiPolygon(feature.geom.geos)
-        code = str(feature.get(field_mapping["code"]))
-        geometry_srid = feature.geom.srid
-
-        # Transform the geometry if required
-        # to suit the database SRID
-        asset_geometry = GEOSGeometry(geom, srid=geometry_srid)
-        if geometry_srid != database_srid:
-            asset_geometry.transform(database_srid)
-
-        if Area.objects.filter(code=code).exists():
-            self.stderr.write(self.style.NOTICE(f"Skip {code} because it already exists"))
-            return Area.objects.get(code=code)
-        try:
-            area = Area.objects.create(
-                name=feature.get(field_mapping["name"]),
-                code=code,
-                kind=area_type,
-                geom=asset_geometry,
-            )
-            return area
-        except IntegrityError as E:
-            self.stderr.write(self.style.ERROR(f"Error writing code {code}: {E}"[:140] + "..."))
+        stats = ImportStats()
+        with transaction.atomic():
+            with Area.objects.disable_mptt_updates():
+                for filename in [f for f in os.listdir(tmpdirname) if f.endswith(".shp")]:
+                    area_definition = area_definition_set[filename]
+                    area_type = AreaType.objects.get_or_create(
+                        name=area_definition["areatype"],
+                        slug=area_definition["areatype"],
+                    )[
+                        0
+                    ]  # type: AreaType
+                    self.stderr.write(self.style.NOTICE(f"Importing {tmpdirname} / {filename}"))
+                    self.import_shp(
+                        shape_path=Path(tmpdirname) / filename,
+                        area_type=area_type,
+                        field_mapping=area_definition,
+                        stats=stats,
+                    )
+            self.stderr.write(self.style.NOTICE("Rebuild the locations Area tree"))
+            Area.objects.rebuild()
+            evict_on_commit(stats.affected)
+        self.stderr.write(self.style.SUCCESS(f"Imported shapes: {stats}"))
+
+    def import_shp(
+        self, shape_path: Path, area_type: AreaType, field_mapping: dict, stats: Optional[ImportStats] = None
+    ) -> ImportStats:
+        """
+        Create areas for the features of a shapefile in batches. Call with MPTT updates
+        disabled, and rebuild the tree after.
+        """
+        return create_areas(
+            read_features(shape_path),
+            area_type=area_type,
+            name_field=field_mapping["name"],
+            code_field=field_mapping["code"],
+            progress=lambda stats: self.stderr.write(self.style.NOTICE(str(stats))),
+            stats=stats,
+        )
 
     def merge_districts(self):
         """
@@ -135,16 +127,9 @@ class Command(BaseCommand):
 
     def rebuild_tree(self):
         self.stderr.write(self.style.SUCCESS("Reset Area parent code"))
-        for a in Area.objects.exclude(kind__name__in=["country", "province"]):
-            try:
-                a.parent = Area.objects.get(code=a.code[:-2])
-                a.save()
-            except Exception as E:
-                warn(f"{E}")
-                pass
-
-        self.stderr.write(self.style.SUCCESS("Rebuild the locations Area tree"))
-        Area.objects.rebuild()
+        # Districts and LLGs are coded by their parent's code and two digits
+        linked = link_parents_by_prefix(strip=2, kinds=["district", "llg"])
+        self.stderr.write(self.style.SUCCESS(f"Linked {linked} areas and rebuilt the locations Area tree"))
 
     def perform_rename(self):
         sources = """Abau District	Abau District
@@ -243,16 +228,25 @@ class Command(BaseCommand):
 
         # Area.objects.all().delete()
         self.stdout.write(self.style.MIGRATE_HEADING("~~~ Starting rename ~~~"))
+        gazetteer = get_gazetteer()
         for rename in renames:
-            try:
-                area = Area.objects.get(name=rename.nso_name, kind__name="district")
-            except Area.DoesNotExist:
+            # `by_name` ignores case and accents: only rename an exact and unique match
+            places = [
+                place
+                for place in gazetteer.by_name(rename.nso_name)
+                if place.kind_name == "district" and place.name == rename.nso_name
+            ]
+            if not places:
                 self.stdout.write(self.style.WARNING(f'Area does not exist: "{rename.nso_name}"'))
                 continue
+            if len(places) > 1:
+                self.stdout.write(self.style.WARNING(f'Several areas are named "{rename.nso_name}"'))
+                continue
 
-            if area.name == rename.wiki_name:
+            if places[0].name == rename.wiki_name:
                 self.stdout.write(self.style.SUCCESS(f'No change: "{rename.nso_name}"'))
             else:
+                area = Area.objects.get(pk=places[0].id)
                 area.name = rename.wiki_name
                 area.save()
                 self.stdout.write(
@@ -0,0 +1,40 @@
+import json
+from pathlib import Path
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from simple_locations.importing import link_parents_by_containment
+
+
+class Command(BaseCommand):
+    help = """Set the parent of each area to the area of the type above it which covers most of it"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("kinds", nargs="+", help="Area type slugs, from the top of the hierarchy down")
+        parser.add_argument(
+            "--min-share",
+            type=float,
+            default=0.9,
+            help="Report areas whose parent covers less than this share of them",
+        )
+        parser.add_argument("--report", type=Path, help="Write the ambiguous and unassigned areas to a JSON file")
+
+    def handle(self, *args: Any, **options: Any):
+        report = link_parents_by_containment(options["kinds"], min_share=options["min_share"])
+        for area in report.ambiguous:
+            self.stderr.write(
+                self.style.WARNING(
+                    f"{area.code}: {area.share or 0:.0%} in {area.parent_id}"
+                    f" ({area.runner_up_share or 0:.0%} in {area.runner_up_id})"
+                )
+            )
+        for area in report.unassigned:
+            self.stderr.write(self.style.WARNING(f"{area.code}: no parent"))
+        if options["report"]:
+            options["report"].write_text(json.dumps(report.as_dict(), indent=2))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Linked {report.linked} areas, {len(report.ambiguous)} ambiguous, {len(report.unassigned)} unassigned"
+            )
+        )
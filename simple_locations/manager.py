@@ -1,10 +1,24 @@
 import io
+from typing import Any, Dict, Iterable, List, Optional
 
 from django.contrib.gis.db.models.functions import AsGeoJSON
-from django.db import models
+from django.contrib.gis.geos import GEOSGeometry
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections, models
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.functions import Concat, Greatest, Least
 from django.http import HttpResponse
+from mptt.managers import TreeManager
+from mptt.querysets import TreeQuerySet
 
-from simple_locations.gis_functions import Multi, Quantize, Simplify
+from simple_locations.gis_functions import (
+    SIMPLIFICATION_LEVELS,
+    Multi,
+    Quantize,
+    Simplify,
+)
+from simple_locations.search import ILike, name_fields
 
 
 class AreaQueryset(models.QuerySet):
@@ -55,3 +69,266 @@ class AreaQueryset(models.QuerySet):
         Directly return a valid HTTPResponse
         """
         return HttpResponse(content_type="application/json", content=self.to_geojson())
+
+    def ancestry(
+        self, point: GEOSGeometry, kind: Optional[str] = None, level: Optional[int] = None
+    ) -> models.QuerySet:
+        """
+        Reverse geocode a point: the deepest area containing the point
+        (optionally of a given kind slug or tree level) and its ancestors,
+        ordered from the root, in a single query.
+
+        The leaf is found with a spatial lookup on `SubdividedArea` and its ancestors
+        from the MPTT `lft` / `rght` range, without reading their geometries
+
+        >>> Area.geofunctions.ancestry(Point(125.57, -8.56, srid=4326))
+        """
+        if point.srid is None:
+            point.srid = 4326
+        # Matched against the subdivided geometries, which are much cheaper to test than whole areas
+        subdivided = self.model._meta.get_field("subdivided").related_model
+        leaves = self.model.objects.filter(pk__in=subdivided.objects.filter(geom__intersects=point).values("area"))
+        if kind is not None:
+            leaves = leaves.filter(kind__slug=kind)
+        if level is not None:
+            leaves = leaves.filter(level=level)
+        leaf = leaves.order_by("-level").values("pk")[:1]
+        return (
+            self.filter(
+                models.Exists(
+                    self.model.objects.filter(
+                        pk=models.Subquery(leaf),
+                        tree_id=models.OuterRef("tree_id"),
+                        lft__gte=models.OuterRef("lft"),
+                        rght__lte=models.OuterRef("rght"),
+                    )
+                )
+            )
+            .defer("geom")
+            .order_by("level")
+        )
+
+
+class AreaTreeQueryset(TreeQuerySet):
+    def with_geometry(self) -> "AreaTreeQueryset":
+        """
+        Opt in to loading the geometry deferred by `AreaTreeManager`
+        """
+        return self.defer(None)
+
+    def annotate_ancestor(
+        self, level: int = 2, fields: Iterable[str] = ("id", "name"), prefix: str = "ancestor"
+    ) -> "AreaTreeQueryset":
+        """
+        Annotate `fields` of each area's ancestor at `level` (or of the area itself
+        when it is at or above that level, like `Area.get_ancestor_at_level`)
+        as "<prefix>_<field>". Fields may follow relations: "kind__name" is
+        annotated as "<prefix>_kind_name".
+        The ancestor is found from the MPTT `lft` / `rght` range of each area.
+
+        >>> Area.lite.filter(kind__slug="suco").annotate_ancestor(1, ["name"], prefix="municipality")
+        """
+        ancestor = self.model.objects.filter(
+            tree_id=models.OuterRef("tree_id"),
+            lft__lte=models.OuterRef("lft"),
+            rght__gte=models.OuterRef("rght"),
+            level=Least(models.Value(level), models.OuterRef("level"), output_field=models.IntegerField()),
+        )
+        return self.annotate(
+            **{
+                f"{prefix}_{field.replace(LOOKUP_SEP, '_')}": models.Subquery(ancestor.values(field)[:1])
+                for field in fields
+            }
+        )
+
+    def with_display_names(self) -> "AreaTreeQueryset":
+        """
+        Annotate `name_and_type` and `name_with_parent`, the values of
+        `Area.display_name_and_type` and `Area.display_with_parent`, which use
+        them instead of querying for the kind and parent of each area
+        """
+        name_and_type = Concat("kind__name", models.Value(" of "), "name", output_field=models.CharField())
+        parent_name_and_type = Concat(
+            "parent__kind__name", models.Value(" of "), "parent__name", output_field=models.CharField()
+        )
+        return self.annotate(
+            name_and_type=name_and_type,
+            name_with_parent=models.Case(
+                models.When(
+                    models.Q(parent__isnull=True) | models.Q(kind__name="District"),
+                    then=name_and_type,
+                ),
+                default=Concat(name_and_type, models.Value(" in "), parent_name_and_type),
+                output_field=models.CharField(),
+            ),
+        )
+
+    def search(
+        self, query: str, kind: Optional[str] = None, level: Optional[int] = None, limit: Optional[int] = 20
+    ) -> "AreaTreeQueryset":
+        """
+        Areas with a name, or translated name, similar to or containing `query`,
+        optionally of a kind (slug) and level, best matches first.
+        Each has a `similarity` annotation and its kind and parent are selected.
+        """
+        fields = name_fields(self.model)
+        similarities = [TrigramSimilarity(field, query) for field in fields]
+        matches = models.Q()
+        for field in fields:
+            # The lookup is used directly rather than registered on every CharField in the project
+            matches |= models.Q(TrigramSimilar(models.F(field), query)) | models.Q(ILike(models.F(field), query))
+
+        areas = (
+            self.filter(matches)
+            .annotate(similarity=Greatest(*similarities) if len(similarities) > 1 else similarities[0])
+            .select_related("kind", "parent__kind")
+            .defer("parent__geom")
+            .order_by("-similarity", "level", "name")
+        )
+        if kind is not None:
+            areas = areas.filter(kind__slug=kind)
+        if level is not None:
+            areas = areas.filter(level=level)
+        return areas[:limit] if limit is not None else areas
+
+    def hierarchy(self, root: Optional[int] = None, depth: Optional[int] = None, nested: bool = True) -> List[Dict]:
+        """
+        The area tree read from the MPTT columns in a single query.
+        Optionally limited to the subtree of a `root` area id, and to `depth`
+        levels below the root (or below the top level).
+
+        When `nested`, returns the root areas, each with a list of "children".
+        Otherwise a flat list in depth first order with "parent", "level",
+        "tree_id", "lft" and "rght" for the client to build the tree.
+        """
+        areas = self.order_by("tree_id", "lft")
+        if root is not None:
+            subtree_root = self.model.objects.filter(
+                pk=root,
+                tree_id=models.OuterRef("tree_id"),
+                lft__lte=models.OuterRef("lft"),
+                rght__gte=models.OuterRef("rght"),
+            )
+            areas = areas.filter(models.Exists(subtree_root))
+            if depth is not None:
+                root_level = self.model.objects.filter(pk=root).values("level")
+                areas = areas.filter(level__lte=models.Subquery(root_level) + depth)
+        elif depth is not None:
+            areas = areas.filter(level__lte=depth)
+
+        fields = ("id", "name", "code", "kind", "parent", "level", "tree_id", "lft", "rght")
+        rows = list(areas.values(*fields))
+        if not nested:
+            return rows
+
+        roots: List[Dict[str, Any]] = []
+        # Open ancestors of the current row, deepest last
+        stack: List[Dict[str, Any]] = []
+        for row in rows:
+            while stack and (stack[-1]["tree_id"] != row["tree_id"] or stack[-1]["rght"] < row["lft"]):
+                stack.pop()
+            node = {"id": row["id"], "name": row["name"], "code": row["code"], "kind": row["kind"], "children": []}
+            (stack[-1]["node"]["children"] if stack else roots).append(node)
+            stack.append({"tree_id": row["tree_id"], "rght": row["rght"], "node": node})
+        return roots
+
+
+class AreaTreeManager(TreeManager.from_queryset(AreaTreeQueryset)):  # type: ignore
+    """
+    Areas in tree order without their geometry, which is by far the
+    largest column, for listing names, codes and the hierarchy
+    """
+
+    def get_queryset(self, *args, **kwargs):
+        return super().get_queryset(*args, **kwargs).defer("geom")
+
+
+class ProjectedAreaQueryset(models.QuerySet):
+    def refresh(self, area_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        (Re)build the projected geometries from Area.
+        When `area_ids` is not given, every Area is rebuilt.
+        """
+        table = self.model._meta.db_table
+        area_table = self.model._meta.get_field("area").related_model._meta.db_table
+        srid = self.model._meta.get_field("geom").srid
+        with connections[self.db].cursor() as cursor:
+            if area_ids is None:
+                cursor.execute(f"TRUNCATE {table}")
+                where, params = "", [srid]
+            else:
+                ids = list(area_ids)
+                cursor.execute(f"DELETE FROM {table} WHERE area_id = ANY(%s)", [ids])
+                where, params = "WHERE area.id = ANY(%s)", [srid, ids]
+            cursor.execute(
+                f"INSERT INTO {table} (geom, area_id) SELECT ST_Transform(area.geom, %s), area.id FROM {area_table} area {where}",
+                params,
+            )
+
+
+class SimplifiedAreaQueryset(models.QuerySet):
+    def refresh(self, area_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        (Re)build the stored geometries at every non-zero simplification level.
+        When `area_ids` is not given, every Area is rebuilt.
+        """
+        table = self.model._meta.db_table
+        area_table = self.model._meta.get_field("area").related_model._meta.db_table
+        levels: List[float] = [level for level in SIMPLIFICATION_LEVELS if level]
+        with connections[self.db].cursor() as cursor:
+            if area_ids is None:
+                cursor.execute(f"TRUNCATE {table}")
+                where, params = "", [levels]
+            else:
+                ids = list(area_ids)
+                cursor.execute(f"DELETE FROM {table} WHERE area_id = ANY(%s)", [ids])
+                where, params = "AND area.id = ANY(%s)", [levels, ids]
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (area_id, simplify, geom)
+                SELECT area.id, levels.simplify, ST_Multi(ST_SimplifyPreserveTopology(area.geom, levels.simplify))
+                FROM {area_table} area, unnest(%s::float8[]) AS levels(simplify)
+                WHERE area.geom IS NOT NULL {where}
+                """,
+                params,
+            )
+
+
+# The largest number of vertices in a subdivided geometry
+SUBDIVIDE_MAX_VERTICES = 256
+
+
+class SubdividedAreaQueryset(models.QuerySet):
+    def _source(self) -> models.Model:
+        """
+        The model which is subdivided: Area, or ProjectedArea for projected geometries
+        """
+        area_model = self.model._meta.get_field("area").related_model
+        if self.model._meta.get_field("geom").srid == area_model._meta.get_field("geom").srid:
+            return area_model
+        return area_model._meta.get_field("projectedarea").related_model
+
+    def refresh(self, area_ids: Optional[Iterable[int]] = None, max_vertices: int = SUBDIVIDE_MAX_VERTICES) -> None:
+        """
+        (Re)build the subdivided geometries. When `area_ids` is not given, every Area is rebuilt.
+        """
+        table = self.model._meta.db_table
+        source = self._source()
+        source_table, source_key = source._meta.db_table, source._meta.pk.column
+        with connections[self.db].cursor() as cursor:
+            if area_ids is None:
+                cursor.execute(f"TRUNCATE {table}")
+                where, params = "", [max_vertices]
+            else:
+                ids = list(area_ids)
+                cursor.execute(f"DELETE FROM {table} WHERE area_id = ANY(%s)", [ids])
+                where, params = f"AND source.{source_key} = ANY(%s)", [max_vertices, ids]
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (area_id, geom)
+                SELECT source.{source_key}, ST_Multi(ST_Subdivide(source.geom, %s))
+                FROM {source_table} source
+                WHERE source.geom IS NOT NULL {where}
+                """,
+                params,
+            )
@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("simple_locations", "0013_auto_20220307_0618"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SimplifiedArea",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("simplify", models.FloatField()),
+                ("geom", django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326)),
+                (
+                    "area",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="simplified",
+                        to="simple_locations.area",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("area", "simplify")},
+            },
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO simple_locations_simplifiedarea (area_id, simplify, geom)
+            SELECT area.id, levels.simplify, ST_Multi(ST_SimplifyPreserveTopology(area.geom, levels.simplify))
+            FROM simple_locations_area area, unnest(ARRAY[0.0001, 0.001, 0.01, 0.1, 0.5]::float8[]) AS levels(simplify)
+            WHERE area.geom IS NOT NULL;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
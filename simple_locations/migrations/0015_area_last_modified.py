@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("simple_locations", "0014_simplifiedarea"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="area",
+            name="last_modified",
+            field=models.DateTimeField(auto_now=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            "UPDATE simple_locations_area SET last_modified = now();",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
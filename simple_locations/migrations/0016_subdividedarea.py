@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("simple_locations", "0015_area_last_modified"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubdividedArea",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("geom", django.contrib.gis.db.models.fields.MultiPolygonField(srid=4326)),
+                (
+                    "area",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="subdivided",
+                        to="simple_locations.area",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SubdividedProjectedArea",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("geom", django.contrib.gis.db.models.fields.MultiPolygonField(srid=3857)),
+                (
+                    "area",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="subdivided_projected",
+                        to="simple_locations.area",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO simple_locations_subdividedarea (area_id, geom)
+            SELECT area.id, ST_Multi(ST_Subdivide(area.geom, 256))
+            FROM simple_locations_area area
+            WHERE area.geom IS NOT NULL;
+
+            INSERT INTO simple_locations_subdividedprojectedarea (area_id, geom)
+            SELECT projected.area_id, ST_Multi(ST_Subdivide(projected.geom, 256))
+            FROM simple_locations_projectedarea projected
+            WHERE projected.geom IS NOT NULL;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
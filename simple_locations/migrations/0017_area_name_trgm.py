@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-18 12:00
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("simple_locations", "0016_subdividedarea"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="area",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="simple_locations_area_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("simple_locations", "0017_area_name_trgm"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="area",
+            name="fingerprint",
+            field=models.CharField(blank=True, default="", editable=False, max_length=64),
+        ),
+    ]
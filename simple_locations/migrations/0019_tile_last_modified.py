@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("simple_locations", "0018_area_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="projectedarea",
+            name="last_modified",
+            field=models.DateTimeField(auto_now=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="border",
+            name="last_modified",
+            field=models.DateTimeField(auto_now=True, db_index=True, editable=False, null=True),
+        ),
+        # ProjectedArea and Border are mostly (re)built in SQL
+        migrations.RunSQL(
+            """
+            ALTER TABLE simple_locations_projectedarea ALTER COLUMN last_modified SET DEFAULT now();
+            ALTER TABLE simple_locations_border ALTER COLUMN last_modified SET DEFAULT now();
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
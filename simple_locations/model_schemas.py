@@ -1,4 +1,6 @@
-from ninja import ModelSchema
+from typing import List, Optional, Tuple
+
+from ninja import ModelSchema, Schema
 
 from simple_locations.models import Area, AreaType
 
@@ -13,3 +15,38 @@ class AreaTypeModelSchema(ModelSchema):
     class Config:
         model = AreaType
         model_fields = ["id", "name", "slug"]
+
+
+class LocatePointsSchema(Schema):
+    points: List[Tuple[float, float]]
+    kind: Optional[str] = None
+    level: Optional[int] = None
+
+
+class AreaListSchema(Schema):
+    """
+    An item of the area list: only the requested fields
+    (and the fields of the ordering) are present
+    """
+
+    id: Optional[int]
+    name: Optional[str]
+    code: Optional[str]
+    kind: Optional[int]
+    parent: Optional[int]
+    level: Optional[int]
+    tree_id: Optional[int]
+    lft: Optional[int]
+    rght: Optional[int]
+
+
+class AreaSearchSchema(Schema):
+    id: int
+    name: str
+    code: str
+    level: int
+    kind_name: Optional[str]
+    parent: Optional[int]
+    parent_name: Optional[str]
+    parent_kind_name: Optional[str]
+    similarity: float
@@ -1,4 +1,4 @@
-from typing import Iterable, List, Optional, Type
+from typing import Iterable, List, Optional, Type, Union
 
 from django.contrib.gis.db.models import (
     GeometryField,
@@ -6,13 +6,22 @@ from django.contrib.gis.db.models import (
     MultiPolygonField,
 )
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from django.db.models import QuerySet
 from django.utils.translation import gettext as _
 from django.utils.translation import gettext_lazy as __
+from mptt.managers import TreeManager
 from mptt.models import MPTTModel
 
 from simple_locations.feature_manager import FeatureQueryset
-from simple_locations.manager import AreaQueryset
+from simple_locations.manager import (
+    AreaQueryset,
+    AreaTreeManager,
+    ProjectedAreaQueryset,
+    SimplifiedAreaQueryset,
+    SubdividedAreaQueryset,
+)
 
 
 def get_geom_field(model) -> GeometryField:
@@ -38,24 +47,10 @@ def intersects_areas(area_ids: Iterable[int], model: models.Model, geom_field: O
     >>> extra_clause = intersects_areas(Area.objects.values_list('id', flat=True), Airstrip)
     >>> Airstrip.objects.extra(**extra_clause, Airstrip)
 
+    Prefer `area_intersection`, which binds the ids as a single parameter
+    and can be combined with other filters.
     """
-
-    def _area_model(srid: int) -> Type[models.Model]:
-        """
-        Determine which model to apply the intersection to
-        based on the SRID
-        """
-        if srid == 4326:
-            return Area
-        elif srid == 3857:
-            return ProjectedArea
-        raise AssertionError("Unhandled SRID")
-
-    geom_field_instance = model._meta.get_field(geom_field) if geom_field else get_geom_field(model)
-
-    if not isinstance(geom_field_instance, GeometryField):
-        raise TypeError
-
+    geom_field_instance = _geom_field(model, geom_field)
     geom_field_name: str = geom_field_instance.db_column or geom_field_instance.attname
 
     area_query_values = ",".join(map(str, area_ids))
@@ -74,6 +69,63 @@ def intersects_areas(area_ids: Iterable[int], model: models.Model, geom_field: O
     )
 
 
+def area_intersection(
+    areas: Union[Iterable[int], QuerySet], model: Type[models.Model], geom_field: Optional[str] = None
+) -> models.Exists:
+    """
+    Return an `Exists` expression which is true for instances of `model`
+    intersecting any of `areas`. Like `intersects_areas`, `Area` or `ProjectedArea`
+    geometries are used depending on the SRID of the model's geometry field,
+    read from their subdivided copies.
+
+    `areas` is either a list of ids, sent as one array parameter, or an Area
+    queryset, used as a subquery. The latter selects a subtree without
+    listing its ids:
+
+    >>> Airstrip.objects.filter(area_intersection([1, 2, 3], Airstrip))
+    >>> Airstrip.objects.filter(area_intersection(province.get_descendants(include_self=True), Airstrip))
+    """
+    geom_field_instance = _geom_field(model, geom_field)
+    subdivided_model = _subdivided_model(geom_field_instance.srid)
+
+    if isinstance(areas, QuerySet):
+        selected = models.Q(area__in=areas.values("pk"))
+    else:
+        ids = models.Value(list(areas), output_field=ArrayField(models.IntegerField()))
+        selected = models.Q(area=models.Func(ids, function="ANY", output_field=models.IntegerField()))
+
+    return models.Exists(
+        subdivided_model.objects.filter(selected, geom__intersects=models.OuterRef(geom_field_instance.name))
+    )
+
+
+def _geom_field(model: Type[models.Model], geom_field: Optional[str] = None) -> GeometryField:
+    geom_field_instance = model._meta.get_field(geom_field) if geom_field else get_geom_field(model)
+    if not isinstance(geom_field_instance, GeometryField):
+        raise TypeError
+    return geom_field_instance
+
+
+def _area_model(srid: int) -> Type[models.Model]:
+    """
+    Determine which model to apply the intersection to
+    based on the SRID
+    """
+    if srid == 4326:
+        return Area
+    elif srid == 3857:
+        return ProjectedArea
+    raise AssertionError("Unhandled SRID")
+
+
+def _subdivided_model(srid: int) -> Type[models.Model]:
+    if srid == 4326:
+        return SubdividedArea
+    elif srid == 3857:
+        return SubdividedProjectedArea
+    raise AssertionError("Unhandled SRID")
+
+
 class DateStampedModel(models.Model):
     date_created = models.DateField(verbose_name=_("Date Created"), auto_now_add=True, null=True, blank=True)
     date_modified = models.DateField(verbose_name=_("Last Modified"), null=True, blank=True)
@@ -111,6 +163,8 @@ class AreaType(models.Model):
 class Area(MPTTModel):
     class Meta:
         unique_together = ("code", "kind")
+        # For `Area.lite.search`
+        indexes = [GinIndex(fields=["name"], name="simple_locations_area_name_trgm", opclasses=["gin_trgm_ops"])]
         verbose_name = __("Area")
         verbose_name_plural = __("Areas")
         app_label = "simple_locations"
@@ -125,6 +179,10 @@ class Area(MPTTModel):
     location = models.ForeignKey(Point, blank=True, null=True, on_delete=models.CASCADE)
     geom = MultiPolygonField(srid=4326, blank=True, null=True)
     parent = models.ForeignKey("self", blank=True, null=True, related_name="children", on_delete=models.CASCADE)
+    # Used to version GeoJSON responses for conditional GETs
+    last_modified = models.DateTimeField(auto_now=True, null=True, editable=False)
+    # A hash of the imported geometry and attributes, to find changed areas on re-import
+    fingerprint = models.CharField(max_length=64, blank=True, default="", editable=False)
 
     def delete(self):
         super(Area, self).delete()
@@ -141,12 +199,19 @@ class Area(MPTTModel):
         """Area name and type
 
         Example District of Bamako"""
+        # Annotated by `with_display_names`
+        annotated = getattr(self, "name_and_type", None)
+        if annotated is not None:
+            return annotated
         return f"{self.kind.name} of {self.name}"
 
     def display_with_parent(self) -> str:
         """Print Area name and kind and parent name and kind
 
         Example: Aldeia of Baha-Neo in Suco of Lia Ruca"""
+        annotated = getattr(self, "name_with_parent", None)
+        if annotated is not None:
+            return annotated
         if not self.parent:
             return self.display_name_and_type()
         elif self.kind.name == "District":
@@ -162,6 +227,10 @@ class Area(MPTTModel):
 
     geofunctions = AreaQueryset.as_manager()
     features = FeatureQueryset.as_manager()
+    # The first tree manager declared is used for tree operations, which need every field
+    objects = TreeManager()
+    # Areas without their geometry
+    lite = AreaTreeManager()
 
 
 class ProjectedArea(models.Model):
@@ -174,6 +243,57 @@ class ProjectedArea(models.Model):
 
     geom = MultiPolygonField(null=True, blank=True, srid=3857)
     area = models.OneToOneField("Area", primary_key=True, on_delete=models.CASCADE)
+    # Used to version vector tiles. The column defaults to now() for rows inserted in SQL
+    last_modified = models.DateTimeField(auto_now=True, null=True, editable=False, db_index=True)
+
+    objects = ProjectedAreaQueryset.as_manager()
+
+
+class SimplifiedArea(models.Model):
+    """
+    Precomputed simplified geometries for each of the
+    non-zero `SIMPLIFICATION_LEVELS`. Simplifying full resolution
+    polygons is the most expensive part of serving a map layer
+    so `FeatureQueryset` reads from here when a level is requested.
+    These are refreshed when an Area is saved, or in bulk with the
+    `create_simplified_areas` command
+    """
+
+    class Meta:
+        unique_together = ("area", "simplify")
+
+    area = models.ForeignKey("Area", related_name="simplified", on_delete=models.CASCADE)
+    simplify = models.FloatField()
+    geom = MultiPolygonField(srid=4326, null=True, blank=True)
+
+    objects = SimplifiedAreaQueryset.as_manager()
+
+
+class SubdividedArea(models.Model):
+    """
+    Area geometries split by ST_Subdivide into pieces of at most
+    `SUBDIVIDE_MAX_VERTICES` vertices. The bounding boxes of the pieces
+    fit far more closely than that of a large, detailed area, and each
+    piece is cheap to test, so spatial lookups are made against this table.
+    These are refreshed when an Area is saved, or in bulk with the
+    `create_subdivided_areas` command
+    """
+
+    area = models.ForeignKey("Area", related_name="subdivided", on_delete=models.CASCADE)
+    geom = MultiPolygonField(srid=4326)
+
+    objects = SubdividedAreaQueryset.as_manager()
+
+
+class SubdividedProjectedArea(models.Model):
+    """
+    As `SubdividedArea`, for `ProjectedArea` geometries
+    """
+
+    area = models.ForeignKey("Area", related_name="subdivided_projected", on_delete=models.CASCADE)
+    geom = MultiPolygonField(srid=3857)
+
+    objects = SubdividedAreaQueryset.as_manager()
 
 
 class Border(models.Model):
@@ -193,6 +313,8 @@ class Border(models.Model):
     # simplify generting and filtering vector data
     area_ids = ArrayField(models.IntegerField(), default=list)
     area_types = ArrayField(models.IntegerField(), default=list)
+    # Used to version vector tiles. The column defaults to now() for rows inserted in SQL
+    last_modified = models.DateTimeField(auto_now=True, null=True, editable=False, db_index=True)
 
 
 class AreaProfile(DateStampedModel):
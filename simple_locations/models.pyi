@@ -1,11 +1,19 @@
-from datetime import date
+from datetime import date, datetime
 from decimal import Decimal
 from typing import Any, Optional
 
 from django.db import models
+from mptt.managers import TreeManager
 from mptt.models import MPTTModel
 
 from simple_locations.feature_manager import FeatureQueryset
+from simple_locations.manager import (
+    AreaQueryset,
+    AreaTreeManager,
+    ProjectedAreaQueryset,
+    SimplifiedAreaQueryset,
+    SubdividedAreaQueryset,
+)
 
 class DateStampedModel(models.Model):
     date_created: date
@@ -49,11 +57,44 @@ class Area(MPTTModel):
     geom: Any
     parent: Area
     parent_id: int
+    last_modified: Optional[datetime]
+    fingerprint: str
     def delete(self) -> None: ...
     def get_ancestor_at_level(self, level: int = ...) -> Area: ...
     def display_name_and_type(self): ...
     def display_with_parent(self): ...
+    geofunctions: AreaQueryset
     features: FeatureQueryset
+    objects: TreeManager
+    lite: AreaTreeManager
+
+class ProjectedArea(models.Model):
+    geom: Any
+    area: Area
+    area_id: int
+    last_modified: Optional[datetime]
+    objects: ProjectedAreaQueryset
+
+class SimplifiedArea(models.Model):
+    class Meta:
+        unique_together: Any
+    area: Area
+    area_id: int
+    simplify: float
+    geom: Any
+    objects: SimplifiedAreaQueryset
+
+class SubdividedArea(models.Model):
+    area: Area
+    area_id: int
+    geom: Any
+    objects: SubdividedAreaQueryset
+
+class SubdividedProjectedArea(models.Model):
+    area: Area
+    area_id: int
+    geom: Any
+    objects: SubdividedAreaQueryset
 
 class AreaProfile(DateStampedModel):
     area: Any
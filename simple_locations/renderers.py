@@ -0,0 +1,35 @@
+"""
+A faster JSON renderer for the ninja API
+
+orjson is used when it is installed (the `orjson` extra),
+otherwise this falls back to the standard library like ninja's own `JSONRenderer`.
+"""
+import json
+from typing import Any
+
+from django.http import HttpRequest
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+
+# orjson is "nice to have"
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    """
+    Serialize data to JSON. Types orjson does not support natively
+    (Decimal, lazy strings, pydantic models) are handled by ninja's encoder.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=NinjaJSONEncoder().default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, cls=NinjaJSONEncoder).encode()
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+
+    def render(self, request: HttpRequest, data: Any, *, response_status: int) -> Any:
+        return dumps(data)
@@ -1,22 +1,308 @@
-from typing import Generator, List, Tuple
+import json
+import math
+from enum import Enum
+from functools import wraps
+from typing import Generator, List, Optional, Union
 
-from ninja import Router
+from django.contrib.gis.geos import Point
+from django.db.models import F, Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from ninja import Query, Router
+from ninja.errors import HttpError
 
 from geojson_pydantic import FeatureCollection, Feature
 
-from simple_locations import model_schemas, models
+from simple_locations import geocoding, model_schemas, models, tiles
+from simple_locations.cache import cached
+from simple_locations.conditional import conditional
+from simple_locations.feature_manager import FeatureQueryset
+from simple_locations.gis_functions import (
+    SIMPLIFICATION_LEVELS,
+    BBox,
+    bbox_simplification,
+)
+from simple_locations.renderers import dumps
 
 router = Router(tags=["SimpleLocations"])
 
-SIMPLIFICATION_LEVELS: Tuple[float, ...] = (0.0, 0.0001, 0.001, 0.01, 0.1, 0.5)
 
+class Render(str, Enum):
+    """
+    How a FeatureCollection response is built:
+     - pydantic: a validated FeatureCollection instance
+     - stream: features are streamed from a server-side cursor
+     - database: the whole collection is built as JSON text by PostGIS
+    """
+
+    pydantic = "pydantic"
+    stream = "stream"
+    database = "database"
+
+
+def _featurecollection(
+    queryset: FeatureQueryset,
+    render: Render,
+    simplify: Union[float, None] = None,
+    quantize: Union[int, None] = None,
+) -> Union[FeatureCollection, HttpResponse, StreamingHttpResponse]:
+    """
+    Return a FeatureCollection for the queryset using the requested render method
+    """
+    if render == Render.stream:
+        return queryset.to_streaming_response(simplify=simplify, quantize=quantize)
+    if render == Render.database:
+        return queryset.to_response(simplify=simplify, quantize=quantize)
+    return queryset.to_featurecollection(simplify=simplify, quantize=quantize)
 
-@router.get("/area/list.json", response=List[model_schemas.AreaModelSchema])
-def area_list(request):
+
+def _by_id(area_id: int, **kwargs) -> FeatureQueryset:
+    return models.Area.features.filter(pk=area_id)
+
+
+def _by_ids(ids: List[int], **kwargs) -> FeatureQueryset:
+    return models.Area.features.for_ids(ids)
+
+
+def _bbox(bbox: Optional[str]) -> Optional[BBox]:
+    """
+    Parse a "xmin,ymin,xmax,ymax" bounding box parameter
+    """
+    if bbox is None:
+        return None
+    try:
+        xmin, ymin, xmax, ymax = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HttpError(400, "bbox should be xmin,ymin,xmax,ymax")
+    if not all(map(math.isfinite, (xmin, ymin, xmax, ymax))) or xmin >= xmax or ymin >= ymax:
+        raise HttpError(400, "bbox should have xmin < xmax and ymin < ymax")
+    return (xmin, ymin, xmax, ymax)
+
+
+def _snap_bbox(bbox: Optional[str]) -> Optional[str]:
+    """
+    Snap a bounding box outwards to a grid of about a hundredth of its size,
+    so that nearby bounding boxes share a cache entry
+    """
+    envelope = _bbox(bbox)
+    if envelope is None:
+        return None
+    xmin, ymin, xmax, ymax = envelope
+    exponent = math.floor(math.log10(max(xmax - xmin, ymax - ymin) / 100))
+    scale = 10.0**-exponent
+    snapped = (
+        math.floor(xmin * scale) / scale,
+        math.floor(ymin * scale) / scale,
+        math.ceil(xmax * scale) / scale,
+        math.ceil(ymax * scale) / scale,
+    )
+    return ",".join(f"{value:.{max(0, -exponent)}f}" for value in snapped)
+
+
+def snap_bbox(func):
+    """
+    Decorate an operation to replace its `bbox` argument with the snapped bounding box,
+    before it is part of a cache key
+    """
+
+    @wraps(func)
+    def inner(request, *args, **kwargs):
+        kwargs["bbox"] = _snap_bbox(kwargs.get("bbox"))
+        return func(request, *args, **kwargs)
+
+    return inner
+
+
+def _in_bbox(queryset: FeatureQueryset, bbox: Optional[str]) -> FeatureQueryset:
+    envelope = _bbox(bbox)
+    return queryset.in_bbox(envelope) if envelope else queryset
+
+
+def _simplification(simplify: Optional[int]) -> Optional[float]:
+    """
+    The tolerance of a `SIMPLIFICATION_LEVELS` index
+    """
+    if simplify is None:
+        return None
+    if not 0 <= simplify < len(SIMPLIFICATION_LEVELS):
+        raise HttpError(400, f"simplify must be from 0 to {len(SIMPLIFICATION_LEVELS) - 1}")
+    return SIMPLIFICATION_LEVELS[simplify]
+
+
+def _bbox_simplification(bbox: Optional[str], simplify_to_bbox: bool) -> Optional[float]:
+    envelope = _bbox(bbox)
+    return bbox_simplification(envelope) if envelope and simplify_to_bbox else None
+
+
+def _by_parent(area_id: int, bbox: Optional[str] = None, **kwargs) -> FeatureQueryset:
+    return _in_bbox(models.Area.features.filter(parent=area_id), bbox)
+
+
+def _by_type(area_type: str, bbox: Optional[str] = None, **kwargs) -> FeatureQueryset:
+    return _in_bbox(models.Area.features.filter(kind__slug=area_type), bbox)
+
+
+def _tile_areas(area_type: Optional[str] = None, level: Optional[int] = None, **kwargs) -> FeatureQueryset:
+    queryset = models.Area.features.all()
+    if area_type is not None:
+        queryset = queryset.filter(kind__slug=area_type)
+    if level is not None:
+        queryset = queryset.filter(level=level)
+    return queryset
+
+
+def _topology(queryset: FeatureQueryset, simplify: Optional[int], quantization: int) -> HttpResponse:
+    """
+    Return a TopoJSON response for the queryset
+    """
+    if quantization < 2:
+        raise HttpError(400, "quantization must be at least 2")
+    topology = queryset.to_topology(simplify=_simplification(simplify), quantization=quantization)
+    return HttpResponse(json.dumps(topology), content_type="application/json")
+
+
+class Ordering(str, Enum):
+    """
+    The order of a paginated list of areas:
+     - id: by primary key
+     - tree: depth first, by the MPTT `tree_id` and `lft` columns
+    """
+
+    id = "id"
+    tree = "tree"
+
+
+# Fields which may be selected in the area list, and the default selection
+AREA_LIST_FIELDS = ("id", "name", "code", "kind", "parent", "level", "tree_id", "lft", "rght")
+AREA_LIST_DEFAULT_FIELDS = ("name", "id", "kind", "parent")
+
+ORDERING_FIELDS = {Ordering.id: ("id",), Ordering.tree: ("tree_id", "lft")}
+
+
+def _after(order: Ordering, after: str) -> Q:
+    """
+    The keyset filter for areas following a cursor: an id, or "tree_id.lft"
+    """
+    try:
+        if order == Ordering.tree:
+            tree_id, lft = (int(value) for value in after.split("."))
+            return Q(tree_id__gt=tree_id) | Q(tree_id=tree_id, lft__gt=lft)
+        return Q(pk__gt=int(after))
+    except ValueError:
+        raise HttpError(400, "Invalid cursor")
+
+
+# The list is rendered from values() without validation, so its schema is documented rather than declared
+AREA_LIST_OPENAPI = {
+    "responses": {
+        200: {
+            "description": "OK",
+            "headers": {"Link": {"description": 'The next page, as <url>; rel="next"', "schema": {"type": "string"}}},
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": model_schemas.AreaListSchema.schema()},
+                }
+            },
+        }
+    }
+}
+
+
+@router.get("/area/list.json", openapi_extra=AREA_LIST_OPENAPI)
+def area_list(
+    request,
+    kind: Optional[str] = None,
+    level: Optional[int] = None,
+    fields: List[str] = Query(None),
+    order: Ordering = Ordering.id,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+):
     """
     Returns a list of area information: name, id, parent id
+
+    Optionally filtered by kind (slug) and level, with other `fields`.
+    When a `limit` is given and there are more areas, a `Link` header
+    has the URL of the next page: pass its `after` cursor to continue.
+    """
+    selected = tuple(fields or AREA_LIST_DEFAULT_FIELDS)
+    unknown = set(selected).difference(AREA_LIST_FIELDS)
+    if unknown:
+        raise HttpError(400, f"Unknown fields: {', '.join(sorted(unknown))}")
+    if limit is not None and limit < 1:
+        raise HttpError(400, "limit must be positive")
+
+    ordering = ORDERING_FIELDS[order]
+    queryset = models.Area.lite.order_by(*ordering)
+    if kind is not None:
+        queryset = queryset.filter(kind__slug=kind)
+    if level is not None:
+        queryset = queryset.filter(level=level)
+    if after is not None:
+        queryset = queryset.filter(_after(order, after))
+    if limit is not None:
+        queryset = queryset[:limit]
+
+    # values() are passed through to the renderer, see AREA_LIST_OPENAPI
+    rows = list(queryset.values(*selected, *(f for f in ordering if f not in selected)))
+    response = HttpResponse(content_type="application/json")
+    if limit is not None and len(rows) == limit:
+        query = request.GET.copy()
+        query["after"] = ".".join(str(rows[-1][f]) for f in ordering)
+        response.headers["Link"] = f'<{request.path}?{query.urlencode()}>; rel="next"'
+    response.content = dumps([{f: row[f] for f in selected} for row in rows])
+    return response
+
+
+@router.get("/area/search.json", response=List[model_schemas.AreaSearchSchema])
+def area_search(request, q: str, kind: Optional[str] = None, level: Optional[int] = None, limit: int = 20):
+    """
+    Returns areas with a name (or translated name) similar to, or containing, `q`
+    with their parent, best matches first
+    """
+    if not 1 <= limit <= 1000:
+        raise HttpError(400, "limit must be between 1 and 1000")
+    return models.Area.lite.search(q, kind=kind, level=level, limit=None).values(
+        "id",
+        "name",
+        "code",
+        "level",
+        "parent",
+        "similarity",
+        kind_name=F("kind__name"),
+        parent_name=F("parent__name"),
+        parent_kind_name=F("parent__kind__name"),
+    )[:limit]
+
+
+@router.get("/area/tree.json")
+@cached("tree")
+def area_tree(request, root: Optional[int] = None, depth: Optional[int] = None, flat: bool = False):
+    """
+    Returns the area hierarchy, optionally the subtree of a `root` area id and
+    limited to `depth` levels. Nested, with "children" lists, or when `flat`
+    a depth first list with "parent", "level", "tree_id", "lft" and "rght"
+    """
+    return HttpResponse(
+        dumps(models.Area.lite.hierarchy(root=root, depth=depth, nested=not flat)), content_type="application/json"
+    )
+
+
+@router.get("/area/by-point.json", response=List[model_schemas.AreaModelSchema])
+def area_point(request, lon: float, lat: float, kind: Optional[str] = None, level: Optional[int] = None):
+    """
+    Returns the deepest area containing a point (optionally of a given kind or level)
+    and its ancestors, ordered from the root
+    """
+    return models.Area.geofunctions.ancestry(Point(lon, lat, srid=4326), kind=kind, level=level)
+
+
+@router.post("/area/locate.json", response=List[Optional[int]])
+def area_locate(request, payload: model_schemas.LocatePointsSchema):
+    """
+    Returns the id of the deepest area (optionally of a given kind or level)
+    containing each of a list of (lon, lat) points, or null
     """
-    return models.Area.objects.all()
+    return geocoding.locate(payload.points, kind=payload.kind, level=payload.level)
 
 
 @router.get("/areatype/list.json", response=List[model_schemas.AreaTypeModelSchema])
@@ -28,49 +314,170 @@ def area_type_list(request):
 
 
 @router.get("/area/by-id/{area_id}.geojson", response=Feature)
-def area_id(request, area_id: int):
+@conditional(_by_id)
+@cached("id", "area_id")
+def area_id(request, area_id: int, response: HttpResponse):
     """
     Returns the geometry of a single Area
     as a single GeoJSON Feature
     """
-    features: Generator[Feature, None, None] = models.Area.features.filter(pk=area_id).to_features()
+    features: Generator[Feature, None, None] = _by_id(area_id).to_features()
     return Feature.parse_obj(next(features))
 
 
+@router.get("/area/by-ids.geojson", response=FeatureCollection)
+@conditional(_by_ids)
+def area_ids(
+    request,
+    response: HttpResponse,
+    ids: List[int] = Query(...),
+    simplify: Optional[int] = None,
+    quantize: Optional[int] = None,
+    render: Render = Render.pydantic,
+):
+    """
+    Returns a batch of Areas as a single FeatureCollection
+    optionally applying simplification and quantization
+    """
+    return _featurecollection(
+        _by_ids(ids),
+        render,
+        simplify=_simplification(simplify),
+        quantize=quantize,
+    )
+
+
 @router.get("/area/by-parent/{area_id}-s{simplify}-q{quantize}.geojson", response=FeatureCollection)
-def area_children_compressed(request, area_id: int, simplify: int, quantize: int):
+@snap_bbox
+@conditional(_by_parent)
+@cached("parent", "area_id")
+def area_children_compressed(
+    request,
+    area_id: int,
+    simplify: int,
+    quantize: int,
+    response: HttpResponse,
+    render: Render = Render.pydantic,
+    bbox: Optional[str] = None,
+):
     """
     Returns the direct descendants of a given Area as a FeatureCollection
-    applying compression methods
+    applying compression methods, optionally limited to a bounding box
     """
-    return models.Area.features.filter(parent=area_id).to_featurecollection(
-        simplify=SIMPLIFICATION_LEVELS[simplify], quantize=quantize
+    return _featurecollection(
+        _by_parent(area_id, bbox),
+        render,
+        simplify=_simplification(simplify),
+        quantize=quantize,
     )
 
 
 @router.get("/area/by-parent/{area_id}.geojson", response=FeatureCollection)
-def area_children(request, area_id: int):
+@snap_bbox
+@conditional(_by_parent)
+@cached("parent", "area_id")
+def area_children(
+    request,
+    area_id: int,
+    response: HttpResponse,
+    render: Render = Render.pydantic,
+    bbox: Optional[str] = None,
+    simplify_to_bbox: bool = False,
+):
     """
     Returns the direct descendants of a given Area as a FeatureCollection
-    applying compression methods
+    optionally limited to a bounding box, and simplified to suit its size
     """
-    return models.Area.features.filter(parent=area_id).to_featurecollection()
+    return _featurecollection(_by_parent(area_id, bbox), render, simplify=_bbox_simplification(bbox, simplify_to_bbox))
 
 
 @router.get("/area/by-type/{area_type}-s{simplify}-q{quantize}.geojson", response=FeatureCollection)
-def area_type_compressed(request, area_type: str, simplify: int, quantize: int):
+@snap_bbox
+@conditional(_by_type)
+@cached("type", "area_type")
+def area_type_compressed(
+    request,
+    area_type: str,
+    simplify: int,
+    quantize: int,
+    response: HttpResponse,
+    render: Render = Render.pydantic,
+    bbox: Optional[str] = None,
+):
     """
     Returns all areas of a given type
-    appliying simplification and quantization
+    appliying simplification and quantization, optionally limited to a bounding box
     """
-    return models.Area.features.filter(kind__slug=area_type).to_featurecollection(
-        simplify=SIMPLIFICATION_LEVELS[simplify], quantize=quantize
+    return _featurecollection(
+        _by_type(area_type, bbox),
+        render,
+        simplify=_simplification(simplify),
+        quantize=quantize,
     )
 
 
 @router.get("/area/by-type/{area_type}.geojson", response=FeatureCollection)
-def area_type(request, area_type: str):
+@snap_bbox
+@conditional(_by_type)
+@cached("type", "area_type")
+def area_type(
+    request,
+    area_type: str,
+    response: HttpResponse,
+    render: Render = Render.pydantic,
+    bbox: Optional[str] = None,
+    simplify_to_bbox: bool = False,
+):
     """
     Returns all areas of a given type
+    optionally limited to a bounding box, and simplified to suit its size
+    """
+    return _featurecollection(_by_type(area_type, bbox), render, simplify=_bbox_simplification(bbox, simplify_to_bbox))
+
+
+@router.get("/area/by-parent/{area_id}.topojson")
+@conditional(_by_parent, models.Border)
+@cached("parent", "area_id")
+def area_children_topology(
+    request, area_id: int, response: HttpResponse, simplify: Optional[int] = None, quantization: int = 100000
+):
+    """
+    Returns the direct descendants of a given Area as TopoJSON
+    with shared borders sent once
+    """
+    return _topology(_by_parent(area_id), simplify, quantization)
+
+
+@router.get("/area/by-type/{area_type}.topojson")
+@conditional(_by_type, models.Border)
+@cached("type", "area_type")
+def area_type_topology(
+    request, area_type: str, response: HttpResponse, simplify: Optional[int] = None, quantization: int = 100000
+):
     """
-    return models.Area.features.filter(kind__slug=area_type).to_featurecollection()
+    Returns all areas of a given type as TopoJSON
+    with shared borders sent once
+    """
+    return _topology(_by_type(area_type), simplify, quantization)
+
+
+@router.get("/tiles/{z}/{x}/{y}.mvt")
+@conditional(_tile_areas, models.ProjectedArea, models.Border)
+def area_tile(
+    request,
+    z: int,
+    x: int,
+    y: int,
+    response: HttpResponse,
+    area_type: Optional[str] = None,
+    level: Optional[int] = None,
+):
+    """
+    Returns a Mapbox Vector Tile with "areas" and "borders" layers,
+    optionally filtered by area type and tree level
+    """
+    if not tiles.is_valid_tile(z, x, y):
+        raise Http404
+    return HttpResponse(
+        tiles.area_tile(z, x, y, area_type=area_type, level=level), content_type="application/vnd.mapbox-vector-tile"
+    )
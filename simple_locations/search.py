@@ -0,0 +1,64 @@
+"""
+Trigram search over area names
+
+`Area.name` has a pg_trgm GIN index (migration 0017) which serves both
+similarity (`%`) and substring (`ILIKE`, see `ILike`) matches. When django-modeltranslation
+is installed its `name_*` columns are searched too; create their indexes
+with the `create_search_indexes` command.
+"""
+from typing import List, Type
+
+from django.db import connections, models
+from django.db.models.lookups import IContains
+
+
+class ILike(IContains):
+    """
+    A case insensitive substring match compiled to `ILIKE` on PostgreSQL,
+    which a trigram index can serve, rather than `UPPER(...) LIKE UPPER(...)`
+    """
+
+    lookup_name = "ilike"
+
+    def as_sql(self, compiler, connection):
+        lhs_sql, params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs_sql} ILIKE {rhs_sql}", [*params, *rhs_params]
+
+
+def name_fields(model: Type[models.Model], field: str = "name") -> List[str]:
+    """
+    The name field of a model followed by its translated fields, if any
+    """
+    fields = [field]
+    # Translated models are "nice to have"; imported here as the translator reads settings
+    try:
+        from modeltranslation.translator import NotRegistered, translator
+    except ImportError:
+        return fields
+    try:
+        options = translator.get_options_for_model(model)
+    except NotRegistered:
+        return fields
+    fields.extend(sorted(translation.name for translation in options.fields.get(field, ())))
+    return fields
+
+
+def create_trigram_indexes(model: Type[models.Model], field: str = "name", using: str = "default") -> List[str]:
+    """
+    Create pg_trgm GIN indexes for the translated columns of a name field.
+    Returns the names of the indexes, which are left as they are if they exist.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    names = []
+    with connection.cursor() as cursor:
+        for translated in name_fields(model, field)[1:]:
+            column = model._meta.get_field(translated).column
+            name = f"{table}_{column}_trgm"[: connection.ops.max_name_length()]
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {connection.ops.quote_name(name)} "
+                f"ON {connection.ops.quote_name(table)} USING gin ({connection.ops.quote_name(column)} gin_trgm_ops)"
+            )
+            names.append(name)
+    return names
@@ -0,0 +1,170 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+from django.db.models import QuerySet
+from django.db.models.functions import Now
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from mptt.signals import node_moved
+
+from simple_locations import cache, gazetteer
+from simple_locations.models import (
+    Area,
+    AreaType,
+    Border,
+    ProjectedArea,
+    SimplifiedArea,
+    SubdividedArea,
+    SubdividedProjectedArea,
+)
+
+_state = threading.local()
+
+
+@contextmanager
+def suppress_eviction() -> Iterator[None]:
+    """
+    Skip the cache and gazetteer eviction on deleting areas, for bulk changes
+    which evict what they changed once their transaction commits
+    """
+    suppressed = getattr(_state, "suppressed", False)
+    _state.suppressed = True
+    try:
+        yield
+    finally:
+        _state.suppressed = suppressed
+
+
+def eviction_suppressed() -> bool:
+    return getattr(_state, "suppressed", False)
+
+
+@receiver(post_save, sender=Area)
+def refresh_simplified_area(sender, instance: Area, raw: bool = False, update_fields=None, **kwargs):
+    """
+    Keep the stored simplified geometries in step with the Area geometry
+    """
+    if raw or (update_fields is not None and "geom" not in update_fields):
+        return
+    SimplifiedArea.objects.refresh([instance.pk])
+
+
+@receiver(post_save, sender=Area)
+def refresh_subdivided_area(sender, instance: Area, raw: bool = False, update_fields=None, **kwargs):
+    """
+    Keep the subdivided geometries used for spatial lookups in step with the Area geometry
+    """
+    if raw or (update_fields is not None and "geom" not in update_fields):
+        return
+    SubdividedArea.objects.refresh([instance.pk])
+
+
+@receiver(post_save, sender=ProjectedArea)
+def refresh_subdivided_projected_area(sender, instance: ProjectedArea, raw: bool = False, **kwargs):
+    if raw:
+        return
+    SubdividedProjectedArea.objects.refresh([instance.pk])
+
+
+@receiver(post_save, sender=AreaType)
+def touch_area_type(sender, instance: AreaType, raw: bool = False, **kwargs):
+    """
+    An AreaType's name is part of its areas' GeoJSON properties
+    so changing it changes the version of those areas
+    """
+    if raw:
+        return
+    Area.objects.filter(kind=instance).update(last_modified=Now())
+
+
+def evict_areas(areas: QuerySet) -> None:
+    """
+    Evict the cached by-id, by-parent and by-type responses containing these areas,
+    and the hierarchy
+    """
+    if cache.get_cache() is None:
+        return
+    cache.invalidate("tree", cache.ALL)
+    ids, parents, types = set(), set(), set()
+    for pk, parent_id, kind_slug in areas.values_list("pk", "parent_id", "kind__slug"):
+        ids.add(pk)
+        parents.add(parent_id)
+        types.add(kind_slug)
+    cache.invalidate("id", *ids)
+    cache.invalidate("parent", *parents)
+    cache.invalidate("type", *types)
+
+
+@receiver(pre_save, sender=Area)
+def evict_previous_area(sender, instance: Area, raw: bool = False, **kwargs):
+    """
+    Evict responses for the area's parent and type before a save changes them
+    """
+    if raw or instance.pk is None:
+        return
+    evict_areas(Area.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Area)
+@receiver(node_moved, sender=Area)
+def evict_area(sender, instance: Area, raw: bool = False, **kwargs):
+    if raw:
+        return
+    evict_areas(Area.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Area)
+def evict_deleted_area(sender, instance: Area, **kwargs):
+    if cache.get_cache() is None or eviction_suppressed():
+        return
+    cache.invalidate("tree", cache.ALL)
+    cache.invalidate("id", instance.pk)
+    cache.invalidate("parent", instance.parent_id)
+    cache.invalidate("type", *AreaType.objects.filter(pk=instance.kind_id).values_list("slug", flat=True))
+
+
+def evict_borders(area_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Evict the cached responses, including TopoJSON, of the areas sharing these borders;
+    of every area if the borders were rebuilt
+    """
+    evict_areas(Area.objects.all() if area_ids is None else Area.objects.filter(pk__in=list(area_ids)))
+
+
+@receiver(post_save, sender=Border)
+@receiver(post_delete, sender=Border)
+def evict_border(sender, instance: Border, raw: bool = False, **kwargs):
+    if raw or cache.get_cache() is None:
+        return
+    evict_borders(instance.area_ids)
+
+
+@receiver(pre_save, sender=AreaType)
+def evict_previous_area_type(sender, instance: AreaType, raw: bool = False, **kwargs):
+    if raw or instance.pk is None or cache.get_cache() is None:
+        return
+    cache.invalidate("type", *AreaType.objects.filter(pk=instance.pk).values_list("slug", flat=True))
+
+
+@receiver(post_save, sender=AreaType)
+@receiver(post_delete, sender=AreaType)
+def evict_area_type(sender, instance: AreaType, raw: bool = False, **kwargs):
+    """
+    The type name is a property of every area of this type
+    """
+    if raw:
+        return
+    cache.invalidate("type", instance.slug)
+    evict_areas(Area.objects.filter(kind=instance))
+
+
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Area)
+@receiver(node_moved, sender=Area)
+@receiver(post_save, sender=AreaType)
+@receiver(post_delete, sender=AreaType)
+def invalidate_gazetteer(sender, raw: bool = False, **kwargs):
+    if raw or eviction_suppressed():
+        return
+    gazetteer.invalidate()
@@ -0,0 +1,67 @@
+from typing import Optional
+
+from django.db import connections
+
+# Width of the EPSG:3857 world in metres
+WORLD_SIZE = 40075016.68557849
+
+# Tile resolution for ST_AsMVT / ST_AsMVTGeom
+EXTENT = 4096
+
+
+class Scripts:
+    tile = """
+        WITH bounds AS (
+            SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom
+        ),
+        areas AS (
+            SELECT
+                area.id, area.name, area.code, area.parent_id AS parent, area.level, areatype.slug AS kind,
+                ST_AsMVTGeom(ST_SimplifyPreserveTopology(projected.geom, %(tolerance)s), bounds.geom, %(extent)s) AS geom
+            FROM bounds, simple_locations_projectedarea projected
+            JOIN simple_locations_area area ON area.id = projected.area_id
+            LEFT JOIN simple_locations_areatype areatype ON areatype.id = area.kind_id
+            WHERE projected.geom && bounds.geom
+            AND (%(area_type)s::text IS NULL OR areatype.slug = %(area_type)s)
+            AND (%(level)s::int IS NULL OR area.level = %(level)s)
+        ),
+        borders AS (
+            SELECT
+                border.id, border.area_ids, border.area_types,
+                ST_AsMVTGeom(ST_Simplify(border.geom, %(tolerance)s), bounds.geom, %(extent)s) AS geom
+            FROM bounds, simple_locations_border border
+            WHERE border.geom && bounds.geom
+            AND (
+                %(area_type)s::text IS NULL
+                OR border.area_types && ARRAY(SELECT id FROM simple_locations_areatype WHERE slug = %(area_type)s)
+            )
+            AND (
+                %(level)s::int IS NULL
+                OR EXISTS (SELECT 1 FROM simple_locations_area area WHERE area.id = ANY(border.area_ids) AND area.level = %(level)s)
+            )
+        )
+        SELECT
+            COALESCE((SELECT ST_AsMVT(areas.*, 'areas', %(extent)s, 'geom') FROM areas), ''::bytea)
+            || COALESCE((SELECT ST_AsMVT(borders.*, 'borders', %(extent)s, 'geom') FROM borders), ''::bytea)
+    """  # noqa: E501
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= 30 and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def area_tile(
+    z: int, x: int, y: int, area_type: Optional[str] = None, level: Optional[int] = None, using: str = "default"
+) -> bytes:
+    """
+    A Mapbox Vector Tile with an "areas" layer from `ProjectedArea`
+    and a "borders" layer from `Border`, optionally filtered to an area type
+    (by slug) and tree level. Geometries are simplified to the tile's pixel size.
+    """
+    tolerance = WORLD_SIZE / 2**z / EXTENT
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            Scripts.tile,
+            dict(z=z, x=x, y=y, tolerance=tolerance, extent=EXTENT, area_type=area_type, level=level),
+        )
+        return bytes(cursor.fetchone()[0])
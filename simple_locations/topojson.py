@@ -0,0 +1,190 @@
+"""
+TopoJSON output built from the shared arcs in `Border`
+
+Each Border is an arc shared by the areas in its `area_ids`. An area's geometry
+is the list of its arcs chained into closed rings, so the common boundary of two
+adjacent areas is sent once. Coordinates are quantized to an integer grid and
+delta encoded as described in https://github.com/topojson/topojson-specification
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Coordinate = Tuple[float, float]
+Node = Tuple[int, int]
+
+
+class Ring:
+    """
+    A closed ring of arc references. An index `i` is arc `i` in its stored
+    direction; `~i` is arc `i` reversed.
+    """
+
+    def __init__(self, arcs: List[int], coordinates: List[Coordinate]):
+        self.arcs = arcs
+        self.coordinates = coordinates
+
+    @property
+    def signed_area(self) -> float:
+        """
+        Shoelace area: positive when the ring is anticlockwise
+        """
+        c = self.coordinates
+        return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(c, c[1:] + c[:1])) / 2
+
+    def reversed(self) -> "Ring":
+        return Ring([~i for i in reversed(self.arcs)], list(reversed(self.coordinates)))
+
+    def contains(self, point: Coordinate) -> bool:
+        """
+        Ray casting point in polygon test
+        """
+        x, y = point
+        inside = False
+        c = self.coordinates
+        for (x0, y0), (x1, y1) in zip(c, c[1:] + c[:1]):
+            if (y0 > y) != (y1 > y) and x < (x1 - x0) * (y - y0) / (y1 - y0) + x0:
+                inside = not inside
+        return inside
+
+    def inner_point(self) -> Coordinate:
+        """
+        The midpoint of the first segment, which is less likely than
+        a vertex to be shared with a neighbouring ring
+        """
+        (x0, y0), (x1, y1) = self.coordinates[0], self.coordinates[1 % len(self.coordinates)]
+        return ((x0 + x1) / 2, (y0 + y1) / 2)
+
+
+class Topology:
+    def __init__(self, arcs: Sequence[Sequence[Coordinate]], quantization: int = 100000):
+        if quantization < 2:
+            raise ValueError("quantization must be at least 2")
+        coordinates = [c for arc in arcs for c in arc]
+        xs, ys = [c[0] for c in coordinates] or [0.0], [c[1] for c in coordinates] or [0.0]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        self.scale = (
+            (self.bbox[2] - self.bbox[0]) / (quantization - 1) or 1.0,
+            (self.bbox[3] - self.bbox[1]) / (quantization - 1) or 1.0,
+        )
+        self.arcs = [self.quantize_arc(arc) for arc in arcs]
+        self.coordinates = [list(arc) for arc in arcs]
+
+    def quantize(self, coordinate: Coordinate) -> Node:
+        return (
+            round((coordinate[0] - self.bbox[0]) / self.scale[0]),
+            round((coordinate[1] - self.bbox[1]) / self.scale[1]),
+        )
+
+    def quantize_arc(self, arc: Sequence[Coordinate]) -> List[Node]:
+        """
+        Quantized arc coordinates without consecutive duplicates
+        """
+        nodes: List[Node] = []
+        for coordinate in arc:
+            node = self.quantize(coordinate)
+            if not nodes or nodes[-1] != node:
+                nodes.append(node)
+        return nodes
+
+    def rings(self, arc_indexes: Iterable[int]) -> List[Ring]:
+        """
+        Chain arcs into closed rings by matching their end points
+        """
+        by_node: Dict[Node, List[int]] = defaultdict(list)
+        # Arcs which collapse to a single point when quantized are skipped
+        unused = set(i for i in arc_indexes if len(self.arcs[i]) > 1)
+        for i in unused:
+            by_node[self.arcs[i][0]].append(i)
+            by_node[self.arcs[i][-1]].append(i)
+
+        rings = []
+        while unused:
+            first = min(unused)
+            unused.discard(first)
+            refs, coordinates = [first], self.coordinates[first][:-1]
+            start, node = self.arcs[first][0], self.arcs[first][-1]
+            while node != start:
+                following = next((i for i in by_node[node] if i in unused), None)
+                if following is None:
+                    break  # The ring is not closed: incomplete borders
+                unused.discard(following)
+                if self.arcs[following][0] == node:
+                    refs.append(following)
+                    coordinates.extend(self.coordinates[following][:-1])
+                    node = self.arcs[following][-1]
+                else:
+                    refs.append(~following)
+                    coordinates.extend(list(reversed(self.coordinates[following]))[:-1])
+                    node = self.arcs[following][0]
+            if coordinates:
+                rings.append(Ring(refs, coordinates))
+        return rings
+
+    def polygons(self, arc_indexes: Iterable[int]) -> List[List[List[int]]]:
+        """
+        Group an area's rings into polygons: rings inside an odd number of
+        other rings are holes, and belong to the smallest exterior containing them.
+        Exteriors are clockwise and holes anticlockwise.
+        """
+        rings = self.rings(arc_indexes)
+        depth = [sum(other.contains(ring.inner_point()) for other in rings if other is not ring) for ring in rings]
+        exteriors = [ring for ring, d in zip(rings, depth) if d % 2 == 0]
+        holes = [ring for ring, d in zip(rings, depth) if d % 2 == 1]
+
+        polygons: Dict[int, List[Ring]] = {id(e): [e if e.signed_area < 0 else e.reversed()] for e in exteriors}
+        for hole in holes:
+            containing = [e for e in exteriors if e.contains(hole.inner_point())]
+            if containing:
+                exterior = min(containing, key=lambda e: abs(e.signed_area))
+                polygons[id(exterior)].append(hole if hole.signed_area > 0 else hole.reversed())
+        return [[ring.arcs for ring in polygon] for polygon in polygons.values()]
+
+    def encoded_arcs(self) -> List[List[Node]]:
+        """
+        Delta encoded, quantized arcs
+        """
+        encoded = []
+        for arc in self.arcs:
+            previous = (0, 0)
+            deltas = []
+            for x, y in arc:
+                deltas.append((x - previous[0], y - previous[1]))
+                previous = (x, y)
+            encoded.append(deltas)
+        return encoded
+
+
+def build_topology(
+    areas: Iterable[Dict[str, Any]],
+    borders: Iterable[Tuple[List[int], Sequence[Coordinate]]],
+    quantization: int = 100000,
+    object_name: str = "areas",
+) -> Dict[str, Any]:
+    """
+    Return a TopoJSON Topology for `areas` (dicts of properties with an "id")
+    from `borders`, pairs of (area ids, arc coordinates)
+    """
+    areas = list(areas)
+    area_ids = {area["id"] for area in areas}
+    arcs: List[Sequence[Coordinate]] = []
+    area_arcs: Dict[int, List[int]] = defaultdict(list)
+    for border_area_ids, coordinates in borders:
+        index = len(arcs)
+        arcs.append(coordinates)
+        for area_id in area_ids.intersection(border_area_ids):
+            area_arcs[area_id].append(index)
+
+    topology = Topology(arcs, quantization=quantization)
+    geometries = []
+    for area in areas:
+        polygons = topology.polygons(area_arcs[area["id"]])
+        geometry: Dict[str, Optional[Any]] = {"type": "MultiPolygon", "arcs": polygons} if polygons else {"type": None}
+        geometries.append({**geometry, "id": area["id"], "properties": area})
+
+    return {
+        "type": "Topology",
+        "bbox": list(topology.bbox),
+        "transform": {"scale": list(topology.scale), "translate": list(topology.bbox[:2])},
+        "objects": {object_name: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": topology.encoded_arcs(),
+    }
@@ -8,6 +8,7 @@ from django.views.decorators.cache import cache_control
 from djgeojson.views import GeoJSONLayerView
 from mptt.exceptions import InvalidMove
 
+from simple_locations.conditional import ConditionalLayerMixin
 from simple_locations.models import Area, AreaType, Point
 
 from .forms import LocationForm
@@ -19,7 +20,7 @@ def simple_locations(request):
     firefox likes to aggressively cache forms set cache control to false to override this
     """
     form = LocationForm()
-    nodes = Area.objects.all()
+    nodes = Area.lite.all()
     return render(
         request,
         "simple_locations/index.html",
@@ -33,7 +34,7 @@ def simple_locations(request):
 
 
 def add_location(req, parent_id=None):
-    nodes = Area.objects.all()
+    nodes = Area.lite.all()
 
     if req.method == "POST":
         form = LocationForm(req.POST)
@@ -93,7 +94,7 @@ def add_location(req, parent_id=None):
 
 
 def edit_location(req, area_id):
-    location = get_object_or_404(Area, pk=area_id)
+    location = get_object_or_404(Area.lite, pk=area_id)
     if req.method == "POST":
         form = LocationForm(req.POST)
         if form.is_valid():
@@ -136,14 +137,14 @@ def edit_location(req, area_id):
                 return render(
                     req,
                     "simple_locations/location_edit.html",
-                    {"form": form, "nodes": Area.objects.all()},
+                    {"form": form, "nodes": Area.lite.all()},
                     context_instance=RequestContext(req),
                 )
             else:
                 return render(
                     req,
                     "simple_locations/location_edit.html",
-                    {"form": form, "item": location, "nodes": Area.objects.all()},
+                    {"form": form, "item": location, "nodes": Area.lite.all()},
                     context_instance=RequestContext(req),
                 )
 
@@ -172,7 +173,7 @@ def edit_location(req, area_id):
         return render(
             req,
             "simple_locations/location_edit.html",
-            {"form": form, "nodes": Area.objects.all(), "item": location},
+            {"form": form, "nodes": Area.lite.all(), "item": location},
             context_instance=RequestContext(req),
         )
 
@@ -187,7 +188,7 @@ def delete_location(request, area_id):
 
 @cache_control(no_cache=True)
 def render_location(request):
-    nodes = Area.objects.all()
+    nodes = Area.lite.all()
     return render(request, "simple_locations/treepanel.html", {"nodes": nodes})
 
 
@@ -196,9 +197,10 @@ def area_search(request):
 
     areadetails = []
     if request.GET.__contains__("query"):
-        objects = Area.objects.filter(name__iregex=request.GET["query"])
+        limit = int(request.GET["limit"]) if request.GET.get("limit", "").isdigit() else 20
+        objects = Area.lite.search(request.GET["query"], limit=limit)
     else:
-        objects = Area.objects.all()
+        objects = Area.lite.select_related("kind", "parent__kind").defer("parent__geom")
     for area in objects:
         areadetail = {}
         areadetail["value"] = area.pk
@@ -212,19 +214,23 @@ def area_search(request):
     return HttpResponse(json.dumps(areadetails))
 
 
-class AreaJSONLayerView(GeoJSONLayerView):
+class AreaJSONLayerView(ConditionalLayerMixin, GeoJSONLayerView):
     precision = 3
     simplify = 0.002
 
     def get_queryset(self, *args, **kwargs):
-        areas = [i for i in self.request.GET.getlist("locations[]", []) if i.isnumeric()]
-        queryset = (
-            super(AreaJSONLayerView, self).get_queryset(*args, **kwargs).filter(Q(geom__isnull=False, pk__in=areas))
-        )
-        return queryset
+        areas = [int(i) for i in self.request.GET.getlist("locations[]", []) if i.isnumeric()]
+        return Area.features.for_ids(areas).filter(geom__isnull=False)
+
+    def render_to_response(self, context, **response_kwargs):
+        """
+        Render with a database assembled FeatureCollection
+        rather than django-geojson's serializer
+        """
+        return self.get_queryset().to_response(simplify=self.simplify, quantize=self.precision)
 
 
-class ChildAreasJSONLayerView(GeoJSONLayerView):
+class ChildAreasJSONLayerView(ConditionalLayerMixin, GeoJSONLayerView):
     precision = 3
     simplify = 0.002
 
@@ -1,13 +1,17 @@
+import json
+
 from django.test import Client, TestCase
 from django.urls import reverse
 
+from simple_locations.gis_functions import SIMPLIFICATION_LEVELS
+from simple_locations.models import Area, ProjectedArea
 from tests.factories import AreaFactory
 
 
 class SimpleLocationsAPITests(TestCase):
     def setUp(self):
         self.client = Client()
-        a = AreaFactory()
+        self.area = a = AreaFactory()
 
         self.area_list_url = reverse("api-1.0.0:area_list")
         self.area_type_list_url = reverse("api-1.0.0:area_type_list")
@@ -25,6 +29,85 @@ class SimpleLocationsAPITests(TestCase):
         response = self.client.get(self.area_list_url)
         self.assertEqual(response.status_code, 200)
 
+    def test_area_list_schema(self):
+        paths = json.loads(self.client.get(reverse("api-1.0.0:openapi-json")).content)["paths"]
+        (operation,) = [path["get"] for url, path in paths.items() if url.endswith("/area/list.json")]
+        schema = operation["responses"]["200"]["content"]["application/json"]["schema"]
+        self.assertEqual(schema["type"], "array")
+        self.assertIn("tree_id", schema["items"]["properties"])
+
+    def test_area_list_pages(self):
+        child = AreaFactory(parent=self.area)
+        response = self.client.get(self.area_list_url, {"limit": 1, "fields": ["id", "level"]})
+        self.assertEqual(json.loads(response.content), [{"id": self.area.id, "level": 0}])
+        next_url = response.headers["Link"].split(">")[0][1:]
+        response = self.client.get(next_url)
+        self.assertEqual(json.loads(response.content), [{"id": child.id, "level": 1}])
+        response = self.client.get(self.area_list_url, {"limit": 1, "after": child.id})
+        self.assertEqual(json.loads(response.content), [])
+        self.assertNotIn("Link", response.headers)
+
+        response = self.client.get(self.area_list_url, {"order": "tree", "after": f"{child.tree_id}.{child.lft - 1}"})
+        self.assertEqual([area["id"] for area in json.loads(response.content)], [child.id])
+        response = self.client.get(self.area_list_url, {"level": 1})
+        self.assertEqual(
+            json.loads(response.content),
+            [{"name": child.name, "id": child.id, "kind": child.kind_id, "parent": self.area.id}],
+        )
+        response = self.client.get(self.area_list_url, {"fields": ["geom"]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_area_tree(self):
+        child = AreaFactory(parent=self.area)
+        grandchild = AreaFactory(parent=child)
+        other = AreaFactory()
+        url = reverse("api-1.0.0:area_tree")
+
+        # Roots are ordered by name
+        tree = {node["id"]: node for node in json.loads(self.client.get(url).content)}
+        self.assertEqual(set(tree), {self.area.id, other.id})
+        self.assertEqual(tree[self.area.id]["children"][0]["id"], child.id)
+        self.assertEqual(tree[self.area.id]["children"][0]["children"][0]["id"], grandchild.id)
+        self.assertEqual(tree[other.id]["children"], [])
+
+        subtree = json.loads(self.client.get(url, {"root": child.id, "depth": 0}).content)
+        self.assertEqual(
+            subtree, [{"id": child.id, "name": child.name, "code": child.code, "kind": child.kind_id, "children": []}]
+        )
+
+        flat = json.loads(self.client.get(url, {"root": self.area.id, "flat": True}).content)
+        self.assertEqual(
+            [(node["id"], node["parent"]) for node in flat],
+            [(self.area.id, None), (child.id, self.area.id), (grandchild.id, child.id)],
+        )
+
+    def test_area_search(self):
+        baucau = AreaFactory(name="Baucau", parent=self.area)
+        AreaFactory(name="Baguia", parent=self.area)
+        response = self.client.get(reverse("api-1.0.0:area_search"), {"q": "Bacau"})
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.content)
+        self.assertEqual(results[0]["id"], baucau.id)
+        self.assertEqual(results[0]["parent"], self.area.id)
+        self.assertEqual(results[0]["parent_name"], self.area.name)
+        self.assertEqual(results[0]["kind_name"], baucau.kind.name)
+
+        response = self.client.get(reverse("api-1.0.0:area_search"), {"q": "Bau", "level": 0})
+        self.assertEqual(json.loads(response.content), [])
+
+        # Substrings match case insensitively, with ILIKE so that the trigram index is used
+        self.assertEqual([area.id for area in Area.objects.search("AUCA", level=1)], [baucau.id])
+        self.assertIn(" ILIKE ", str(Area.objects.search("auca").query))
+
+    def test_lite_manager(self):
+        self.assertEqual(Area.lite.get(pk=self.area.pk).get_deferred_fields(), {"geom"})
+        self.assertEqual(Area.lite.with_geometry().get(pk=self.area.pk).get_deferred_fields(), set())
+        # Tree operations load whole areas
+        self.assertIsNot(Area._tree_manager, Area.lite)
+        self.assertEqual(
+            Area.objects.get(pk=self.area.pk).get_descendants(include_self=True).get().get_deferred_fields(), set()
+        )
+
     def test_areatype_list(self):
         response = self.client.get(self.area_type_list_url)
         self.assertEqual(response.status_code, 200)
@@ -48,3 +131,127 @@ class SimpleLocationsAPITests(TestCase):
     def test_area_type_compressed(self):
         response = self.client.get(self.area_type_compressed_url)
         self.assertEqual(response.status_code, 200)
+
+    def test_area_by_type_streamed(self):
+        response = self.client.get(self.area_type_url, {"render": "stream"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        collection = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(collection["type"], "FeatureCollection")
+        self.assertEqual(len(collection["features"]), 1)
+
+    def test_area_children_compressed_streamed(self):
+        response = self.client.get(self.area_children_compressed_url, {"render": "stream"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+
+    def test_area_by_type_database(self):
+        response = self.client.get(self.area_type_compressed_url, {"render": "database"})
+        self.assertEqual(response.status_code, 200)
+        collection = json.loads(response.content)
+        self.assertEqual(collection["type"], "FeatureCollection")
+        self.assertEqual(len(collection["features"]), 1)
+
+    def test_area_by_type_not_modified(self):
+        response = self.client.get(self.area_type_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response.headers)
+        self.assertIn("Last-Modified", response.headers)
+        response = self.client.get(self.area_type_url, HTTP_IF_NONE_MATCH=response.headers["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_area_by_id_modified(self):
+        response = self.client.get(self.area_id_url)
+        etag = response.headers["ETag"]
+        self.area.name = "Renamed"
+        self.area.save()
+        response = self.client.get(self.area_id_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_area_tile(self):
+        url = reverse("api-1.0.0:area_tile", kwargs={"z": 0, "x": 0, "y": 0})
+        response = self.client.get(url, {"area_type": self.area.kind.slug, "level": 0})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Type"], "application/vnd.mapbox-vector-tile")
+        response = self.client.get(reverse("api-1.0.0:area_tile", kwargs={"z": 1, "x": 2, "y": 0}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_area_tile_versioned_by_projected_areas(self):
+        url = reverse("api-1.0.0:area_tile", kwargs={"z": 0, "x": 0, "y": 0})
+        etag = self.client.get(url).headers["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # The tile draws ProjectedArea, which changes without saving an Area
+        ProjectedArea.objects.refresh()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_area_by_type_topology(self):
+        url = reverse("api-1.0.0:area_type_topology", kwargs={"area_type": self.area.kind.slug})
+        response = self.client.get(url, {"simplify": 2, "quantization": 1000})
+        self.assertEqual(response.status_code, 200)
+        topology = json.loads(response.content)
+        self.assertEqual(topology["type"], "Topology")
+        self.assertEqual(len(topology["objects"]["areas"]["geometries"]), 1)
+        for quantization in (1, 0, -5):
+            response = self.client.get(url, {"quantization": quantization})
+            self.assertEqual(response.status_code, 400)
+        for simplify in (-1, len(SIMPLIFICATION_LEVELS)):
+            response = self.client.get(url, {"simplify": simplify})
+            self.assertEqual(response.status_code, 400)
+
+    def test_area_by_ids(self):
+        b = AreaFactory()
+        url = reverse("api-1.0.0:area_ids")
+        response = self.client.get(
+            url, {"ids": [self.area.id, b.id], "simplify": 2, "quantize": 5, "render": "database"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["features"]), 2)
+        response = self.client.get(url, {"ids": [b.id]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["features"]), 1)
+        for simplify in (-1, len(SIMPLIFICATION_LEVELS)):
+            response = self.client.get(url, {"ids": [b.id], "simplify": simplify})
+            self.assertEqual(response.status_code, 400)
+
+    def test_area_json_layer(self):
+        response = self.client.get(reverse("data"), {"locations[]": [self.area.id, "x"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["features"]), 1)
+
+    def test_area_by_type_bbox(self):
+        response = self.client.get(self.area_type_url, {"bbox": "0.5,0.5,1.5,1.5", "simplify_to_bbox": True})
+        self.assertEqual(len(json.loads(response.content)["features"]), 1)
+        response = self.client.get(self.area_type_url, {"bbox": "10,10,11,11"})
+        self.assertEqual(len(json.loads(response.content)["features"]), 0)
+        response = self.client.get(self.area_type_url, {"bbox": "10,10"})
+        self.assertEqual(response.status_code, 400)
+        for bbox in ("1.5,0.5,0.5,1.5", "0.5,0.5,0.5,1.5", "nan,0,1,1"):
+            response = self.client.get(self.area_type_url, {"bbox": bbox, "simplify_to_bbox": True})
+            self.assertEqual(response.status_code, 400)
+
+    def test_area_by_point(self):
+        child = AreaFactory(parent=self.area, geom=self.area.geom)
+        response = self.client.get(reverse("api-1.0.0:area_point"), {"lon": 0.1, "lat": 0.5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([a["id"] for a in json.loads(response.content)], [self.area.id, child.id])
+        response = self.client.get(reverse("api-1.0.0:area_point"), {"lon": 0.1, "lat": 0.5, "level": 0})
+        self.assertEqual([a["id"] for a in json.loads(response.content)], [self.area.id])
+        response = self.client.get(reverse("api-1.0.0:area_point"), {"lon": 5, "lat": 5})
+        self.assertEqual(json.loads(response.content), [])
+
+    def test_area_locate(self):
+        child = AreaFactory(parent=self.area, geom=self.area.geom)
+        response = self.client.post(
+            reverse("api-1.0.0:area_locate"),
+            {"points": [[0.1, 0.5], [5, 5], [0.1, 0.5]], "level": 0},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), [self.area.id, None, self.area.id])
+        response = self.client.post(
+            reverse("api-1.0.0:area_locate"), {"points": [[0.1, 0.5]]}, content_type="application/json"
+        )
+        self.assertEqual(json.loads(response.content), [child.id])
@@ -1,10 +1,11 @@
 import itertools
+import json
 
 from django.db.models import QuerySet
 from django.test import TestCase
 
-from simple_locations.gis_functions import AsGeoJson, JsonFeature
-from simple_locations.models import Area
+from simple_locations.gis_functions import SIMPLIFICATION_LEVELS, AsGeoJson, JsonFeature
+from simple_locations.models import Area, SimplifiedArea
 from geojson_pydantic import FeatureCollection, Feature
 from tests.factories import AreaFactory  # type: ignore
 
@@ -58,6 +59,41 @@ class FeatureManagerTests(TestCase):
         fc = Area.features.to_featurecollection()
         self.assertIsInstance(fc, FeatureCollection)
 
+    def test_streamed_collection(self):
+        """
+        A streamed FeatureCollection should join to the same collection
+        """
+        for n in range(5):
+            AreaFactory()
+        collection = FeatureCollection.parse_obj(json.loads("".join(Area.features.iter_featurecollection())))
+        self.assertEqual(len(collection.features), Area.objects.count())
+
+    def test_database_collection(self):
+        """
+        A FeatureCollection assembled by the database should be valid,
+        including when there are no features
+        """
+        for n in range(5):
+            AreaFactory()
+        collection = FeatureCollection.parse_raw(Area.features.to_featurecollection_json(simplify=1e-3, quantize=5))
+        self.assertEqual(len(collection.features), Area.objects.count())
+        empty = json.loads(Area.features.none().to_featurecollection_json())
+        self.assertEqual(empty["features"], [])
+
+    def test_stored_simplification(self):
+        """
+        Saving an Area stores a geometry for each simplification level,
+        which is used when features are requested at that level
+        """
+        levels = [level for level in SIMPLIFICATION_LEVELS if level]
+        self.assertEqual(SimplifiedArea.objects.filter(area=self.area).count(), len(levels))
+        SimplifiedArea.objects.all().delete()
+        SimplifiedArea.objects.refresh()
+        self.assertEqual(SimplifiedArea.objects.count(), Area.objects.count() * len(levels))
+        for level in levels:
+            for feature in Area.features.to_features(simplify=level, quantize=3):
+                self.assertEqual(feature.geometry.type, "MultiPolygon")
+
     def test_features_simplified(self):
         for q in range(5):
             for feature in Area.features.to_features(quantize=q):
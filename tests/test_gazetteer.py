@@ -0,0 +1,40 @@
+from django.test import TestCase
+
+from simple_locations.gazetteer import get_gazetteer, normalise
+from tests.factories import AreaFactory, AreaTypeFactory  # type: ignore
+
+
+class GazetteerTests(TestCase):
+    def setUp(self):
+        self.country = AreaFactory(name="Timor-Leste", code="TL", kind=AreaTypeFactory(name="Country", slug="country"))
+        self.municipality = AreaFactory(
+            name="Díli",
+            code="TL-DI",
+            parent=self.country,
+            kind=AreaTypeFactory(name="Municipality", slug="municipality"),
+        )
+
+    def test_lookups(self):
+        gazetteer = get_gazetteer()
+        with self.assertNumQueries(0):
+            self.assertEqual(gazetteer.by_code("TL-DI").id, self.municipality.id)
+            self.assertIsNone(gazetteer.by_code("TL-DI", kind="country"))
+            self.assertEqual(
+                [place.id for place in gazetteer.by_name(" dili ", kind="municipality")], [self.municipality.id]
+            )
+            self.assertEqual([place.id for place in gazetteer.ancestors(self.municipality.id)], [self.country.id])
+            self.assertEqual(gazetteer.ancestor_at_level(self.municipality.id, 0).id, self.country.id)
+            self.assertEqual([place.id for place in gazetteer.children(self.country.id)], [self.municipality.id])
+        self.assertIs(get_gazetteer(), gazetteer)
+
+    def test_invalidated_on_save(self):
+        gazetteer = get_gazetteer()
+        self.municipality.code = "TL-DL"
+        self.municipality.save()
+        self.assertIsNot(get_gazetteer(), gazetteer)
+        self.assertEqual(get_gazetteer().by_code("TL-DL").id, self.municipality.id)
+        self.assertIsNone(get_gazetteer().by_code("TL-DI"))
+
+    def test_normalise(self):
+        self.assertEqual(normalise("  Baucau   Vila "), normalise("baucau vila"))
+        self.assertEqual(normalise("Liquiçá"), "liquica")
@@ -0,0 +1,270 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Polygon
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from simple_locations import cache
+from simple_locations.gazetteer import get_gazetteer
+from simple_locations.geometry import prepare_geometry
+from simple_locations.importing import (
+    import_areas,
+    import_sources,
+    link_parents_by_containment,
+    link_parents_by_prefix,
+    load_mapping,
+    read_features,
+)
+from simple_locations.models import Area, SimplifiedArea, SubdividedArea
+from tests.factories import AreaFactory, AreaTypeFactory  # type: ignore
+
+
+def square(x: float, y: float):
+    return {"type": "Polygon", "coordinates": [[[x, y], [x + 1, y], [x + 1, y + 1], [x, y + 1], [x, y]]]}
+
+
+def write_features(path: Path, codes, **properties):
+    features = [
+        {
+            "type": "Feature",
+            "properties": {"NAME": f"Area {code}", "CODE": code, **properties},
+            "geometry": square(i, 0),
+        }
+        for i, code in enumerate(codes)
+    ]
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+
+
+class ImportAreasTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = Path(self.directory.name) / "areas.geojson"
+        write_features(self.path, ["A1", "A2", "A2", "EXISTING"])
+        self.existing = AreaFactory(code="EXISTING")
+
+    def test_import_areas(self):
+        progress = []
+        stats = import_areas(
+            read_features(self.path),
+            AreaTypeFactory(name="Province"),
+            name_field="NAME",
+            code_field="CODE",
+            batch_size=2,
+            progress=progress.append,
+        )
+        self.assertEqual((stats.read, stats.created, stats.skipped, stats.failed), (4, 2, 2, 0))
+        self.assertEqual(len(progress), 2)
+
+        areas = Area.objects.filter(code__in=["A1", "A2"])
+        self.assertEqual(sorted(areas.values_list("name", flat=True)), ["Area A1", "Area A2"])
+        # The tree is rebuilt: each import is a root of its own tree
+        self.assertEqual(set(Area.objects.values_list("tree_id", flat=True)), set(range(1, Area.objects.count() + 1)))
+        self.assertTrue(SimplifiedArea.objects.filter(area__in=areas).exists())
+        self.assertEqual(SubdividedArea.objects.filter(area__in=areas).count(), 2)
+
+    def test_evicted_on_commit(self):
+        area_type = AreaTypeFactory(name="Province")
+        gazetteer = get_gazetteer()
+        with self.captureOnCommitCallbacks() as callbacks:
+            import_areas(read_features(self.path), area_type, name_field="NAME", code_field="CODE")
+        self.assertIs(get_gazetteer(), gazetteer)
+        for callback in callbacks:
+            callback()
+        self.assertIsNot(get_gazetteer(), gazetteer)
+
+    def test_import_sources(self):
+        directory = Path(self.directory.name)
+        write_features(directory / "provinces.geojson", ["P1", "P2"])
+        write_features(directory / "districts.geojson", ["P101", "P102", "P201"])
+        write_features(directory / "llgs.geojson", ["L1"], DISTRICT="P102")
+        (directory / "mapping.json").write_text(
+            json.dumps(
+                {
+                    "provinces.geojson": {"areatype": "province", "name": "NAME", "code": "CODE"},
+                    "districts.geojson": {
+                        "areatype": "district",
+                        "name": "NAME",
+                        "code": "CODE",
+                        "parent_code": {"strip": 2},
+                    },
+                    "llgs.geojson": {
+                        "areatype": "llg",
+                        "name": "NAME",
+                        "code": "CODE",
+                        "parent_code": {"field": "DISTRICT"},
+                    },
+                }
+            )
+        )
+        paths = [directory / name for name in ("llgs.geojson", "districts.geojson", "provinces.geojson")]
+        stats = import_sources(paths, load_mapping(directory / "mapping.json"), workers=2, batch_size=1)
+        self.assertEqual((stats.read, stats.created, stats.failed), (6, 6, 0))
+
+        llg = Area.objects.get(code="L1")
+        self.assertEqual([area.code for area in llg.get_ancestors()], ["P1", "P102"])
+        self.assertEqual(Area.objects.get(code="P201").parent.code, "P2")
+        self.assertEqual(llg.kind.slug, "llg")
+
+    def test_differential_import(self):
+        directory = Path(self.directory.name)
+        write_features(directory / "provinces.geojson", ["P1", "P2"])
+        write_features(directory / "districts.geojson", ["P101", "P102", "P201"])
+        mapping = {
+            "provinces.geojson": {"areatype": "province", "name": "NAME", "code": "CODE"},
+            "districts.geojson": {"areatype": "district", "name": "NAME", "code": "CODE", "parent_code": {"strip": 2}},
+        }
+        (directory / "mapping.json").write_text(json.dumps(mapping))
+        paths = [directory / "provinces.geojson", directory / "districts.geojson"]
+        import_sources(paths, load_mapping(directory / "mapping.json"), workers=1)
+        unchanged = Area.objects.get(code="P101")
+
+        # P102 is removed, so P201 takes its place (and geometry)
+        write_features(directory / "districts.geojson", ["P101", "P201"])
+        stats = import_sources(paths, load_mapping(directory / "mapping.json"), workers=1, differential=True)
+        self.assertEqual((stats.created, stats.updated, stats.unchanged, stats.deleted), (0, 1, 3, 1))
+
+        report = stats.report()
+        self.assertEqual([area["code"] for area in report["changes"]["updated"]], ["P201"])
+        self.assertEqual([area["code"] for area in report["changes"]["deleted"]], ["P102"])
+        self.assertFalse(Area.objects.filter(code="P102").exists())
+        self.assertEqual(Area.objects.get(code="P101").last_modified, unchanged.last_modified)
+        p201 = Area.objects.get(code="P201")
+        self.assertEqual(p201.parent.code, "P2")
+        self.assertEqual(p201.subdivided.get().geom.extent, (1.0, 0.0, 2.0, 1.0))
+
+    @override_settings(SIMPLE_LOCATIONS_CACHE="default")
+    def test_differential_delete_evicted_on_commit(self):
+        directory = Path(self.directory.name)
+        write_features(directory / "provinces.geojson", ["P1"])
+        write_features(directory / "districts.geojson", ["P101", "P102"])
+        mapping = {
+            "provinces.geojson": {"areatype": "province", "name": "NAME", "code": "CODE"},
+            "districts.geojson": {"areatype": "district", "name": "NAME", "code": "CODE", "parent_code": {"strip": 2}},
+        }
+        (directory / "mapping.json").write_text(json.dumps(mapping))
+        paths = [directory / "provinces.geojson", directory / "districts.geojson"]
+        import_sources(paths, load_mapping(directory / "mapping.json"), workers=1)
+        response_cache, p1 = cache.get_cache(), Area.objects.get(code="P1")
+        token, gazetteer = cache.generation(response_cache, "parent", p1.pk), get_gazetteer()
+
+        write_features(directory / "districts.geojson", ["P101"])
+        with self.captureOnCommitCallbacks() as callbacks:
+            stats = import_sources(paths, load_mapping(directory / "mapping.json"), workers=1, differential=True)
+        self.assertEqual(stats.deleted, 1)
+        # Nothing is evicted until the import commits
+        self.assertEqual(cache.generation(response_cache, "parent", p1.pk), token)
+        self.assertIs(get_gazetteer(), gazetteer)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(cache.generation(response_cache, "parent", p1.pk), token)
+        self.assertIsNot(get_gazetteer(), gazetteer)
+
+    def test_import_sources_code_conflict(self):
+        directory = Path(self.directory.name)
+        (directory / "mapping.json").write_text(
+            json.dumps({"areas.geojson": {"areatype": "province", "name": "NAME", "code": "CODE"}})
+        )
+        stats = import_sources([self.path], load_mapping(directory / "mapping.json"), workers=1)
+        # EXISTING belongs to another kind, so is reported rather than failing the import
+        self.assertEqual((stats.created, stats.conflicts), (2, 1))
+        self.assertEqual(
+            stats.changes["conflicts"], [{"id": self.existing.pk, "code": "EXISTING", "kind": self.existing.kind_id}]
+        )
+        self.assertEqual(Area.objects.get(code="EXISTING").kind, self.existing.kind)
+
+
+class PrepareGeometryTests(SimpleTestCase):
+    def test_polygon(self):
+        wkb = prepare_geometry(bytes(Polygon.from_bbox((0, 0, 1, 1)).wkb), 4326)
+        self.assertIsInstance(GEOSGeometry(memoryview(wkb)), MultiPolygon)
+
+    def test_repair(self):
+        bowtie = Polygon(((0, 0), (1, 1), (1, 0), (0, 1), (0, 0)))
+        self.assertFalse(bowtie.valid)
+        geom = GEOSGeometry(memoryview(prepare_geometry(bytes(bowtie.wkb), 4326)))
+        self.assertTrue(geom.valid)
+
+    def test_not_a_polygon(self):
+        self.assertIsNone(prepare_geometry(bytes(GEOSGeometry("POINT (1 1)").wkb), 4326))
+
+    def test_spatial_reference_without_srid(self):
+        # As read from an ESRI .prj, which has no EPSG authority
+        mercator = "+proj=merc +a=6378137 +b=6378137 +lat_ts=0 +lon_0=0 +x_0=0 +y_0=0 +k=1 +units=m +no_defs"
+        polygon = Polygon.from_bbox((0, 0, 111319.49, 111325.14))
+        geom = GEOSGeometry(memoryview(prepare_geometry(bytes(polygon.wkb), mercator)))
+        for x, y in zip(geom.extent, (0, 0, 1, 1)):
+            self.assertAlmostEqual(x, y, places=4)
+        # Features are failed rather than written untransformed
+        self.assertIsNone(prepare_geometry(bytes(polygon.wkb), "not a spatial reference"))
+
+
+class LinkParentsByPrefixTests(TestCase):
+    def test_link_parents_by_prefix(self):
+        province, district = AreaTypeFactory(slug="province"), AreaTypeFactory(slug="district")
+        with Area.objects.disable_mptt_updates():
+            p1 = AreaFactory(code="P1", kind=province)
+            p101 = AreaFactory(code="P101", kind=district)
+            p10101 = AreaFactory(code="P10101", kind=district)
+            orphan = AreaFactory(code="P901", kind=district)
+            # The parent code matches an area, but not of the parent kinds
+            AreaFactory(code="P2", kind=AreaTypeFactory(slug="region"))
+            p201 = AreaFactory(code="P201", kind=district)
+
+        self.assertEqual(link_parents_by_prefix(strip=2, kinds=["district"], parent_kinds=["province", "district"]), 2)
+        self.assertEqual(Area.objects.get(pk=p10101.pk).get_ancestors().get(level=0), p1)
+        self.assertEqual(Area.objects.get(pk=p101.pk).parent, p1)
+        self.assertIsNone(Area.objects.get(pk=orphan.pk).parent)
+        self.assertIsNone(Area.objects.get(pk=p201.pk).parent)
+        # Areas already linked are not updated again
+        self.assertEqual(link_parents_by_prefix(strip=2, kinds=["district"], parent_kinds=["province", "district"]), 0)
+
+    def test_gazetteer_invalidated_without_rebuild(self):
+        AreaFactory(code="P1")
+        child = AreaFactory(code="P101")
+        gazetteer = get_gazetteer()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(link_parents_by_prefix(strip=2, rebuild=False), 1)
+        self.assertEqual(get_gazetteer().get(child.pk).parent_id, Area.objects.get(code="P1").pk)
+        self.assertIsNot(get_gazetteer(), gazetteer)
+
+
+def box(x0: float, y0: float, x1: float, y1: float) -> MultiPolygon:
+    return MultiPolygon(Polygon.from_bbox((x0, y0, x1, y1)), srid=4326)
+
+
+class LinkParentsByContainmentTests(TestCase):
+    def test_link_parents_by_containment(self):
+        province, district, llg = (AreaTypeFactory(slug=slug) for slug in ("province", "district", "llg"))
+        west = AreaFactory(kind=province, geom=box(0, 0, 2, 2))
+        east = AreaFactory(kind=province, geom=box(2, 0, 4, 2))
+        inside = AreaFactory(kind=district, geom=box(0, 0, 1, 1))
+        # 60% in the west province and 40% in the east
+        straddling = AreaFactory(kind=district, geom=box(1.4, 0, 2.4, 1))
+        outside = AreaFactory(kind=district, geom=box(10, 10, 11, 11))
+        ward = AreaFactory(kind=llg, geom=box(0, 0, 0.5, 0.5))
+
+        report = link_parents_by_containment(["province", "district", "llg"])
+        self.assertEqual(report.linked, 3)
+        self.assertEqual([area.area_id for area in report.ambiguous], [straddling.pk])
+        self.assertEqual(report.ambiguous[0].parent_id, west.pk)
+        self.assertEqual(report.ambiguous[0].runner_up_id, east.pk)
+        self.assertAlmostEqual(report.ambiguous[0].share, 0.6)
+        self.assertEqual([area.area_id for area in report.unassigned], [outside.pk])
+
+        self.assertEqual(Area.objects.get(pk=inside.pk).parent, west)
+        self.assertEqual(list(Area.objects.get(pk=ward.pk).get_ancestors()), [west, Area.objects.get(pk=inside.pk)])
+        # Areas already linked are not updated again
+        self.assertEqual(link_parents_by_containment(["province", "district", "llg"]).linked, 0)
+
+    def test_touching_is_not_contained(self):
+        province, district = AreaTypeFactory(slug="province"), AreaTypeFactory(slug="district")
+        AreaFactory(kind=province, geom=box(0, 0, 1, 1))
+        # Shares an edge with the province but none of its interior
+        touching = AreaFactory(kind=district, geom=box(1, 0, 2, 1))
+
+        report = link_parents_by_containment(["province", "district"])
+        self.assertEqual((report.linked, report.ambiguous), (0, []))
+        self.assertEqual([area.area_id for area in report.unassigned], [touching.pk])
+        self.assertIsNone(Area.objects.get(pk=touching.pk).parent)
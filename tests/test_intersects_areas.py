@@ -1,7 +1,12 @@
 from django.contrib.gis.geos import Point
 from django.test import TestCase
 
-from simple_locations.models import Area, intersects_areas  # type: ignore
+from simple_locations.models import (  # type: ignore
+    Area,
+    SubdividedArea,
+    area_intersection,
+    intersects_areas,
+)
 from sl_tests.models import WgsPoint
 from tests.factories import AreaFactory, WgsPointFactory  # type: ignore
 
@@ -20,3 +25,19 @@ class IntersectsAreaTestCase(TestCase):
             **intersects_areas(Area.objects.all().values_list("id", flat=True), WgsPoint)
         )
         self.assertEqual(filtered_points.count(), 1)
+
+    def test_area_intersection(self):
+        ids = list(Area.objects.values_list("id", flat=True))
+        self.assertEqual(WgsPoint.objects.filter(area_intersection(ids, WgsPoint)).count(), 1)
+        self.assertEqual(WgsPoint.objects.filter(area_intersection([], WgsPoint)).count(), 0)
+
+    def test_area_intersection_subtree(self):
+        subtree = self.area.get_descendants(include_self=True)
+        self.assertEqual(WgsPoint.objects.filter(area_intersection(subtree, WgsPoint)).count(), 1)
+        self.assertEqual(WgsPoint.objects.exclude(area_intersection(subtree, WgsPoint)).count(), 1)
+
+    def test_subdivided_area(self):
+        self.assertTrue(SubdividedArea.objects.filter(area=self.area).exists())
+        self.area.geom = None
+        self.area.save()
+        self.assertFalse(SubdividedArea.objects.filter(area=self.area).exists())
@@ -0,0 +1,88 @@
+import gzip
+import json
+
+from django.contrib.gis.geos import LineString
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from simple_locations import artifacts
+from simple_locations.models import Area, Border
+from tests.factories import AreaFactory
+
+
+@override_settings(SIMPLE_LOCATIONS_CACHE="default")
+class CachedRouterTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.parent = AreaFactory()
+        self.area = AreaFactory(parent=self.parent)
+        self.urls = [
+            reverse("api-1.0.0:area_id", kwargs={"area_id": self.area.id}),
+            reverse("api-1.0.0:area_children", kwargs={"area_id": self.parent.id}),
+            reverse("api-1.0.0:area_type", kwargs={"area_type": self.area.kind.slug}),
+            reverse(
+                "api-1.0.0:area_type_compressed",
+                kwargs={"area_type": self.area.kind.slug, "simplify": 2, "quantize": 3},
+            ),
+        ]
+
+    def names(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        content = json.loads(response.content)
+        features = content["features"] if content["type"] == "FeatureCollection" else [content]
+        return [feature["properties"]["name"] for feature in features]
+
+    def test_bbox_snapped(self):
+        url = reverse("api-1.0.0:area_type", kwargs={"area_type": self.area.kind.slug})
+        self.assertEqual(self.names(f"{url}?bbox=0.5,0.5,2.5,2.5"), [self.area.name])
+        # Not a save: the cached response is kept
+        Area.objects.filter(pk=self.area.pk).update(name="Renamed")
+        # Bounding boxes within a hundredth of their size share a cache entry
+        self.assertEqual(self.names(f"{url}?bbox=0.502,0.503,2.497,2.5"), [self.area.name])
+
+    def test_cache_evicted_on_save(self):
+        for url in self.urls:
+            self.assertEqual(self.names(url), [self.area.name])
+        self.area.name = "Renamed"
+        self.area.save()
+        for url in self.urls:
+            self.assertEqual(self.names(url), ["Renamed"])
+
+    def test_topology_versioned_by_borders(self):
+        url = reverse("api-1.0.0:area_children_topology", kwargs={"area_id": self.parent.id})
+        response = self.client.get(url)
+        self.assertEqual(json.loads(response.content)["arcs"], [])
+        Border.objects.create(geom=LineString((0, 0), (100000, 100000), srid=3857), area_ids=[self.area.pk])
+        rebuilt = self.client.get(url, HTTP_IF_NONE_MATCH=response.headers["ETag"])
+        self.assertEqual(rebuilt.status_code, 200)
+        self.assertNotEqual(rebuilt.headers["ETag"], response.headers["ETag"])
+        self.assertEqual(len(json.loads(rebuilt.content)["arcs"]), 1)
+
+    def test_cache_evicted_on_delete(self):
+        url = reverse("api-1.0.0:area_children", kwargs={"area_id": self.parent.id})
+        self.assertEqual(len(self.names(url)), 1)
+        self.area.delete()
+        self.assertEqual(self.names(url), [])
+
+    def test_tree_cache_evicted_on_move(self):
+        url = reverse("api-1.0.0:area_tree")
+        self.assertEqual(len(json.loads(self.client.get(url).content)), 1)
+        self.area.move_to(None)
+        self.assertEqual(len(json.loads(self.client.get(url).content)), 2)
+
+    def test_precompressed(self):
+        url = reverse(
+            "api-1.0.0:area_type_compressed", kwargs={"area_type": self.area.kind.slug, "simplify": 2, "quantize": 5}
+        )
+        artifacts.build(quantize_values=[5], encodings=["gzip"])
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(
+            json.loads(gzip.decompress(response.content))["features"][0]["properties"]["name"], self.area.name
+        )
+        # Identity is served to clients which do not accept gzip
+        response = self.client.get(url)
+        self.assertNotIn("Content-Encoding", response.headers)
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
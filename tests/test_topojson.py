@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+
+from simple_locations.topojson import build_topology
+
+
+class TopologyTestCase(SimpleTestCase):
+    def test_shared_arc(self):
+        """
+        Two squares sharing an edge reference the same arc in opposite directions
+        """
+        borders = [
+            ([1, 2], [(1, 0), (1, 1)]),
+            ([1], [(1, 1), (0, 1), (0, 0), (1, 0)]),
+            ([2], [(1, 0), (2, 0), (2, 1), (1, 1)]),
+        ]
+        topology = build_topology([{"id": 1}, {"id": 2}, {"id": 3}], borders, quantization=3)
+        left, right, empty = topology["objects"]["areas"]["geometries"]
+        self.assertEqual(len(topology["arcs"]), 3)
+        self.assertEqual(left["arcs"], [[[~1, ~0]]])
+        self.assertEqual(right["arcs"], [[[0, ~2]]])
+        self.assertIsNone(empty["type"])
+
+    def test_hole(self):
+        borders = [
+            ([1], [(0, 0), (3, 0), (3, 3), (0, 3), (0, 0)]),
+            ([1], [(1, 1), (1, 2), (2, 2), (2, 1), (1, 1)]),
+        ]
+        topology = build_topology([{"id": 1}], borders, quantization=4)
+        (area,) = topology["objects"]["areas"]["geometries"]
+        # One polygon: a clockwise exterior and an anticlockwise hole
+        self.assertEqual(area["arcs"], [[[~0], [~1]]])
+
+    def test_quantization(self):
+        with self.assertRaises(ValueError):
+            build_topology([{"id": 1}], [([1], [(0, 0), (1, 1)])], quantization=1)
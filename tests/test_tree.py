@@ -0,0 +1,33 @@
+from django.test import TestCase
+
+from simple_locations.models import Area
+from tests.factories import AreaFactory, AreaTypeFactory  # type: ignore
+
+
+class AreaTreeQuerysetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = AreaFactory(kind=AreaTypeFactory(name="Country"))
+        cls.district = AreaFactory(parent=cls.country, kind=AreaTypeFactory(name="District"))
+        cls.suco = AreaFactory(parent=cls.district, kind=AreaTypeFactory(name="Suco"))
+        cls.aldeia = AreaFactory(parent=cls.suco, kind=AreaTypeFactory(name="Aldeia"))
+
+    def test_annotate_ancestor(self):
+        areas = Area.lite.annotate_ancestor(1, ["id", "name", "kind__name"])
+        with self.assertNumQueries(1):
+            ancestors = {area.pk: (area.ancestor_id, area.ancestor_name, area.ancestor_kind_name) for area in areas}
+        self.assertEqual(ancestors[self.aldeia.pk], (self.district.pk, self.district.name, "District"))
+        self.assertEqual(ancestors[self.district.pk], (self.district.pk, self.district.name, "District"))
+        # Areas above the level are their own "ancestor"
+        self.assertEqual(ancestors[self.country.pk], (self.country.pk, self.country.name, "Country"))
+        for area in Area.objects.all():
+            self.assertEqual(ancestors[area.pk][0], area.get_ancestor_at_level(1).pk)
+
+    def test_with_display_names(self):
+        with self.assertNumQueries(1):
+            names = {
+                area.pk: (area.display_name_and_type(), area.display_with_parent())
+                for area in Area.lite.with_display_names()
+            }
+        for area in Area.objects.all():
+            self.assertEqual(names[area.pk], (area.display_name_and_type(), area.display_with_parent()))